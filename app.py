@@ -1,14 +1,14 @@
+import math
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 from io import StringIO
 import zipfile
 
+# pandas and plotly (src.viz) are imported only once there are results to render
 from src.io_json import load_file
-from src.profanity import detect_profanity, PROFANITY_PATTERNS
+from src.profanity import detect_profanity, get_profanity_patterns
 from src.pii_compliance import detect_compliance_violation
 from src.metrics import overtalk_percentage, silence_percentage, talk_share
-from src.viz import timeline_figure, talk_share_pie
 
 st.set_page_config(page_title="Debt Call Analyzer", layout="wide")
 st.title("Debt-Collection Call Analyzer")
@@ -21,18 +21,13 @@ uploaded_files = st.file_uploader(
 strict = st.checkbox("Strict Verification (require borrower confirmation)", value=False)
 
 
-def process_single_buffer(buffer, name="<uploaded>"):
+@st.cache_data(show_spinner=False, max_entries=10000)
+def analyze_buffer(text, name, strict):
+    """Parse and analyze one transcript. Cached, so widget reruns (paging, filters) don't redo it."""
     try:
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = buffer.decode('utf-8')
-        if isinstance(buffer, str):
-            buffer_io = StringIO(buffer)
-            utterances = load_file(buffer_io)
-        else:
-            utterances = load_file(buffer)
+        utterances = load_file(StringIO(text), compact=True)
     except Exception as e:
-        st.error(f"Failed to parse {name}: {e}")
-        return None
+        return {'call_id': Path(name).stem, 'error': f"Failed to parse {name}: {e}"}
 
     # metrics
     ot = overtalk_percentage(utterances)
@@ -42,10 +37,6 @@ def process_single_buffer(buffer, name="<uploaded>"):
     # profanity
     prof = detect_profanity(utterances)
 
-    # Debug: Loaded profanity hits and patterns
-    st.write(f"Debug: Loaded {len(prof.get('hits', []))} profanity hits")
-    st.write(f"Debug: Profanity patterns: {len(PROFANITY_PATTERNS)} loaded")
-
     # compliance
     comp = detect_compliance_violation(utterances, strict=strict)
 
@@ -65,6 +56,18 @@ def process_single_buffer(buffer, name="<uploaded>"):
     }
 
 
+def process_single_buffer(buffer, name="<uploaded>"):
+    if hasattr(buffer, "read"):
+        buffer = buffer.read()
+    if isinstance(buffer, (bytes, bytearray)):
+        buffer = buffer.decode('utf-8')
+    res = analyze_buffer(buffer, name, strict)
+    if res.get('error'):
+        st.error(res['error'])
+        return None
+    return res
+
+
 results = []
 if uploaded_files:
     for uploaded in uploaded_files:
@@ -83,7 +86,14 @@ if uploaded_files:
 
 
 # Render results
-if results:
+calls = [r for r in results if r and not r.get("error")]
+if calls:
+    import pandas as pd
+
+    # Debug: profanity hits and patterns (one line for the whole upload)
+    total_hits = sum(len(r['prof_details'].get('hits', [])) for r in calls)
+    st.caption(f"Debug: Loaded {total_hits} profanity hits; profanity patterns: {len(get_profanity_patterns())} loaded")
+
     df = pd.DataFrame([{
         "File (Call ID)": r.get('call_id', ''),
         "Agent Profanity": r.get('agent_prof', ''),
@@ -94,11 +104,38 @@ if results:
         "Total Time": r.get('total_time', ''),
         "Agent Talk %": r.get('agent_share', ''),
         "Borrower Talk %": r.get('borrower_share', '')
-    } for r in results if r and not r.get("error")])
+    } for r in calls])
 
     st.subheader("Summary Table")
+    col_search, col_show, col_size = st.columns([2, 2, 1])
+    with col_search:
+        search = st.text_input("Filter by call ID", "")
+    with col_show:
+        show = st.selectbox("Show", ["All calls", "Flagged calls", "Compliance violations", "Profanity"])
+    with col_size:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+
+    violation = df["Compliance Violation"] == "Yes"
+    profane = (df["Agent Profanity"] == "Yes") | (df["Borrower Profanity"] == "Yes")
+    mask = pd.Series(True, index=df.index)
+    if search:
+        mask &= df["File (Call ID)"].str.contains(search, case=False, regex=False)
+    if show == "Flagged calls":
+        mask &= violation | profane
+    elif show == "Compliance violations":
+        mask &= violation
+    elif show == "Profanity":
+        mask &= profane
+    view = df[mask]
+
+    # Only the current page is styled and rendered
+    pages = max(1, math.ceil(len(view) / page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1,
+                           key=f"page_{search}_{show}_{page_size}")
+    page_df = view.iloc[(page - 1) * page_size: page * page_size]
+    st.caption(f"Showing {len(page_df)} of {len(view)} matching calls ({len(df)} total)")
     st.markdown(
-        df.style.set_table_styles(
+        page_df.style.set_table_styles(
             [{
                 'selector': 'thead th',
                 'props': [('background-color', '#111111'), ('color', '#00FFFF')]
@@ -114,39 +151,47 @@ if results:
     st.download_button("Download summary CSV", csv, file_name="summary.csv", mime="text/csv")
 
     st.subheader("Detailed Evidence")
-    for r in results:
-        if r is None:
-            continue
-        with st.expander(f"View details for {r['call_id']}"):
-            st.markdown("**Profanity Detection**")
-            if r['prof_details'].get('hits'):
-                st.table(pd.DataFrame(r['prof_details']['hits']))
-            else:
-                st.write("No profane utterances detected.")
-
-            st.markdown("**Compliance Evidence**")
-            st.json(r['comp_details'].get('evidence', {}))
-
-            st.markdown("**Timeline Visualization**")
-            fig = timeline_figure(r['utterances'])
-            if fig:
-                # Add a unique key based on the call_id
-                st.plotly_chart(fig, use_container_width=True, key=f"timeline_{r['call_id']}")
-                col1, col2 = st.columns([2, 1])
-                with col1:
-                    st.markdown("""
+    selected = st.selectbox(
+        "Open call",
+        options=list(view.index),
+        index=None,
+        format_func=lambda i: calls[i]['call_id'],
+        placeholder="Choose a call from the filtered table to view its evidence and timeline"
+    )
+    # Figures are built only for the call being viewed
+    if selected is not None:
+        from src.viz import timeline_figure, talk_share_pie
+        r = calls[selected]
+
+        st.markdown("**Profanity Detection**")
+        if r['prof_details'].get('hits'):
+            st.table(pd.DataFrame(r['prof_details']['hits']))
+        else:
+            st.write("No profane utterances detected.")
+
+        st.markdown("**Compliance Evidence**")
+        st.json(r['comp_details'].get('evidence', {}))
+
+        st.markdown("**Timeline Visualization**")
+        fig = timeline_figure(r['utterances'])
+        if fig:
+            # Add a unique key based on the call_id
+            st.plotly_chart(fig, use_container_width=True, key=f"timeline_{r['call_id']}")
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                st.markdown("""
 **Color Legend:**
 - <span style="color:#00FFFF;font-weight:bold;">■</span> <b>Agent</b>
 - <span style="color:#A569BD;font-weight:bold;">■</span> <b>Borrower</b>
 - <span style="color:#FF8C00;font-weight:bold;">■</span> <b>Overtalk</b> (on interrupter)
 - <span style="color:#B2B6BA;font-weight:bold;">■</span> <b>Silence</b> (between turns)
 """, unsafe_allow_html=True)
-                with col2:
-                    pie_fig = talk_share_pie(r['utterances'])
-                    # Also add a unique key for the pie chart
-                    st.plotly_chart(pie_fig, use_container_width=True, key=f"pie_{r['call_id']}")
-            else:
-                st.warning("No valid utterance timestamps found for timeline visualization.")
+            with col2:
+                pie_fig = talk_share_pie(r['utterances'])
+                # Also add a unique key for the pie chart
+                st.plotly_chart(pie_fig, use_container_width=True, key=f"pie_{r['call_id']}")
+        else:
+            st.warning("No valid utterance timestamps found for timeline visualization.")
 
 st.sidebar.markdown("## Testing")
 if st.sidebar.button("Test Profanity Detection"):
@@ -1,62 +1,492 @@
 # run_batch.py
 import argparse
 import csv
+import importlib.util
 import json
+import re
+import sys
+import time
+import zlib
 from pathlib import Path
-from src.io_json import load_file
+from src.io_json import BulkRecord, is_bulk_file, iter_records, load_input
 from src.profanity import detect_profanity
-from src.pii_compliance import detect_compliance_violation
 from src.metrics import overtalk_percentage, silence_percentage
-from src.metrics import talk_share
+from src.pii_compliance import get_ruleset
+from src.analysis import analyze_utterances, noop_stage, warm_patterns
+from src import match_cache
+from src.telemetry import AnalyzerMetrics, TextfileExporter, start_http_exporter
+from src.sharding import parse_shard, shard_of, shard_dir_name
+from src.sharding import find_shard_dirs, missing_shards, merge_shards
 
-# Excel support (optional)
-try:
-    import pandas as pd
-    import openpyxl
-    from openpyxl.styles import Alignment
-    EXCEL_SUPPORT = True
-except ImportError:
-    EXCEL_SUPPORT = False
+def excel_support():
+    """Excel support is optional; pandas/openpyxl are only imported when Excel output is written."""
+    return all(importlib.util.find_spec(m) is not None for m in ("pandas", "openpyxl"))
 
-def process_file(path: Path, strict=False):
-    """Process a single transcript file and return analysis results."""
+def process_file(path: Path, strict=False, on_stage=noop_stage, rules=None):
+    """Process a single transcript file (or bulk record) and return analysis results."""
+    call_id = path.stem if isinstance(path, BulkRecord) else Path(path).stem
+    on_stage("load")
+    meta = {}
     try:
-        utt = load_file(path)
+        utt = load_input(path, compact=True, meta=meta)
     except Exception as e:
-        return {"call_id": path.stem, "error": str(e)}
+        return {"call_id": call_id, "error": str(e), "stage": "load"}
+
+    res = analyze_utterances(utt, call_id, strict=strict, on_stage=on_stage, rules=rules)
+    if meta:
+        res["metadata"] = meta  # call-level fields, e.g. for --rollups dimensions
+    return res
 
-    # Calculate metrics
-    ot = overtalk_percentage(utt)
-    si = silence_percentage(utt)
-    tt = talk_share(utt)
+def process_profanity_file(path: Path, on_stage=noop_stage):
+    """Profanity-only analysis of a single transcript file or bulk record (used by --profanity)."""
+    call_id = path.stem if isinstance(path, BulkRecord) else Path(path).stem
+    stage = "load"
+    try:
+        # Load file and run profanity detection directly
+        on_stage(stage)
+        utt = load_input(path, compact=True)
+        stage = "profanity"
+        on_stage(stage)
+        prof = detect_profanity(utt)
 
-    # Run detection
-    prof = detect_profanity(utt)
-    comp = detect_compliance_violation(utt, strict=strict)
+        # Calculate metrics
+        stage = "metrics"
+        on_stage(stage)
+        ot = overtalk_percentage(utt)
+        si = silence_percentage(utt)
+    except Exception as e:
+        return {"call_id": call_id, "error": str(e), "stage": stage}
 
     return {
-        "call_id": Path(path).stem,
-        "agent_prof": "Yes" if prof.get("agent_has") else "No",
-        "borrower_prof": "Yes" if prof.get("borrower_has") else "No",
-        "compliance_violation": "Yes" if comp.get("violation") else "No",
-        "overtalk_pct": f"{ot:.2f}%",
-        "silence_pct": f"{si:.2f}%",
-        "total_time": f"{tt['total']:.1f}s",
-        "agent_share": f"{tt['agent_pct']:.1f}%",
-        "borrower_share": f"{tt['borrower_pct']:.1f}%",
+        "call_id": call_id,
         "prof_details": prof,
-        "comp_details": comp,
         "raw_metrics": {
             "overtalk": ot,
-            "silence": si
+            "silence": si,
+            "utterances": len(utt)
         }
     }
 
+def iter_inputs(files, shard=None, telemetry=None):
+    """
+    Expand the input files into work items: per-call files as they are, bulk
+    NDJSON files (see src.io_json.iter_records) into one record per call,
+    streamed. With a shard, bulk records are filtered by their call id.
+    """
+    for f in files:
+        if not is_bulk_file(f):
+            yield f
+            continue
+        try:
+            for record in iter_records(f):
+                if shard and shard_of(record.call_id, shard[1]) != shard[0]:
+                    continue
+                if telemetry is not None:
+                    telemetry.files_total.set(telemetry.files_total.value() + 1)
+                yield record
+        except (OSError, EOFError, UnicodeDecodeError, zlib.error) as e:
+            # a truncated or unreadable bulk file keeps the records read so far
+            print(f"⚠️ Could not finish reading {f}: {e}")
+            call_id = Path(f).name.split(".")[0]
+            if not shard or shard_of(call_id, shard[1]) == shard[0]:  # one error row across all shards
+                yield BulkRecord(str(f), 0, call_id, error=f"unreadable bulk file: {e}")
+
+def iter_results(files, func, args, telemetry=None, **kwargs):
+    """
+    Yield (path, result) for every file, in order.
+    With --timeout or --max_memory_mb, files run in watchdog worker processes
+    and a file that blows its budget comes back as an error row.
+    Stage and per-file latencies are recorded in `telemetry` (AnalyzerMetrics).
+    """
+    telemetry = telemetry or AnalyzerMetrics()
+    if args.timeout or args.max_memory_mb:
+        from src.watchdog import run_with_watchdog
+        warm_patterns()  # compile once here rather than in every (re)started worker
+        timers = {}
+
+        def on_stage_change(f, stage):
+            # stages are reported back from the worker, so timing happens here
+            timers.setdefault(f, telemetry.stage_timer())(stage)
+
+        for f, res in run_with_watchdog(func, files, timeout=args.timeout,
+                                        max_memory_mb=args.max_memory_mb,
+                                        workers=args.workers,
+                                        on_stage_change=on_stage_change, **kwargs):
+            res.setdefault("call_id", f.stem)
+            timer = timers.pop(f, None)
+            telemetry.record(res, timer.finish() if timer else None)
+            yield f, res
+    else:
+        for f in files:
+            timer = telemetry.stage_timer()
+            res = func(f, on_stage=timer, **kwargs)
+            telemetry.record(res, timer.finish())
+            yield f, res
+
+def iter_frame_results(items, args, telemetry=None):
+    """
+    --engine frame: load calls in batches of --frame_batch and analyze each
+    batch as one columnar table (src.frame_engine). Yields (item, result)
+    in order, like iter_results.
+    """
+    from src.frame_engine import analyze_frame
+
+    telemetry = telemetry or AnalyzerMetrics()
+
+    def flush(batch):
+        # batch entries: (item, call_id, utterances, metadata) or (item, call_id, error result, None)
+        calls = [(call_id, utt) for _, call_id, utt, _ in batch if isinstance(utt, list)]
+        started = time.monotonic()
+        analyzed = iter(analyze_frame(calls, strict=args.strict))
+        seconds = (time.monotonic() - started) / max(1, len(calls))  # per call, amortized
+        for f, _, utt, meta in batch:
+            loaded = isinstance(utt, list)
+            res = next(analyzed) if loaded else utt
+            if meta:
+                res["metadata"] = meta
+            telemetry.record(res, seconds if loaded else None)
+            yield f, res
+
+    batch = []
+    for f in items:
+        call_id = f.stem if isinstance(f, BulkRecord) else Path(f).stem
+        meta = {}
+        try:
+            batch.append((f, call_id, load_input(f, compact=True, meta=meta), meta))
+        except Exception as e:
+            batch.append((f, call_id, {"call_id": call_id, "error": str(e), "stage": "load"}, None))
+        if len(batch) >= args.frame_batch:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+def summary_row(res):
+    """Standard-mode summary row for one analyzed call."""
+    return {
+        "File (Call ID)": res["call_id"],
+        "Agent Profanity": res["agent_prof"],
+        "Borrower Profanity": res["borrower_prof"],
+        "Compliance Violation": res["compliance_violation"],
+        "Overtalk %": res["overtalk_pct"],
+        "Silence %": res["silence_pct"],
+        "Total Time": res["total_time"],
+        "Agent Talk %": res["agent_share"],
+        "Borrower Talk %": res["borrower_share"]
+    }
+
+def detail_rows_for(res):
+    """Standard-mode detail rows (profanity hits, compliance reason) for one analyzed call."""
+    rows = []
+    # Add details for profanity
+    for hit in res["prof_details"].get("hits", []):
+        rows.append({
+            "File (Call ID)": res["call_id"],
+            "Type": "Profanity",
+            "Speaker": hit.get("speaker", ""),
+            "Text": hit.get("text", ""),
+            "Matches": ", ".join(hit.get("matches", []))
+        })
+
+    # Add details for compliance violations
+    ev = res["comp_details"].get("evidence", {})
+    if isinstance(ev, dict) and ev.get("reason"):
+        rows.append({
+            "File (Call ID)": res["call_id"],
+            "Type": "Compliance",
+            "Speaker": "agent",
+            "Text": ev.get("reason", ""),
+            "Matches": json.dumps(ev.get("examples", []))
+        })
+
+    # Add details for the other rules from --rules (the first rule's evidence is the one above)
+    for name, rule in list(res["comp_details"].get("rules", {}).items())[1:]:
+        if rule.get("violation"):
+            rule_ev = rule.get("evidence", {})
+            rows.append({
+                "File (Call ID)": res["call_id"],
+                "Type": "Compliance",
+                "Speaker": "agent",
+                "Text": f"{name}: {rule_ev.get('reason', '')}",
+                "Matches": json.dumps(rule_ev.get("examples", []))
+            })
+    return rows
+
+SUMMARY_FIELDS = ["File (Call ID)", "Agent Profanity", "Borrower Profanity", "Compliance Violation",
+                  "Overtalk %", "Silence %", "Total Time", "Agent Talk %", "Borrower Talk %"]
+DETAIL_FIELDS = ["File (Call ID)", "Type", "Speaker", "Text", "Matches"]
+ERROR_FIELDS = ["call_id", "stage", "timed_out", "error"]
+
+def append_csv(path, fields, rows):
+    """Append rows to a CSV, writing the header if the file is new."""
+    if not rows:
+        return
+    new = not Path(path).exists() or Path(path).stat().st_size == 0
+    with open(path, "a", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fields)
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def open_rollups(args, input_path, shard=None):
+    """
+    --rollups: the partial store under <output_dir>/rollups for this input
+    (and shard). Watch mode resumes its partials; a batch run replaces them.
+    """
+    from src.rollups import RollupStore
+
+    source = str(input_path.resolve()) + (f"#shard {shard[0]}/{shard[1]}" if shard else "")
+    return RollupStore(Path(args.output_dir) / "rollups", source, resume=args.watch)
+
+def add_rollup(rollups, f, res, input_path, path_regex):
+    """Account one successful result in the rollup partials (dimensions from metadata, then the file path)."""
+    source = Path(f.source) if isinstance(f, BulkRecord) else Path(f)
+    try:
+        rel_path = source.relative_to(input_path).as_posix()
+    except ValueError:
+        rel_path = source.as_posix()
+    rollups.add_result(res, rel_path, path_regex)
+
+def report_rollups(args):
+    """--report_rollups: merge the stored partials for [--since, --until] into rollup_<dims>.csv."""
+    from src.rollups import load_partials, rollup
+
+    by = [d.strip() for d in args.report_rollups.split(",") if d.strip()]
+    root = Path(args.output_dir) / "rollups"
+    try:
+        rows = rollup(load_partials(root, args.since, args.until), by)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    if not rows:
+        print(f"⚠️ No rollup partials found in {root} for the requested range")
+        return
+    out_file = Path(args.output_dir) / f"rollup_{'_'.join(by)}.csv"
+    with open(out_file, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    span = f" from {args.since or 'the start'} to {args.until or 'now'}" if args.since or args.until else ""
+    print(f"✅ Rollup by {', '.join(by)} ({sum(r['calls'] for r in rows)} calls{span}) saved to {out_file}")
+
+def watch_input(args, input_path, results_dir, telemetry, rollups=None):
+    """
+    --watch: keep polling the input tree and append rows for each newly
+    landed (and fully written) transcript to the summary/details outputs.
+    """
+    from src.watcher import DropWatcher
+
+    suffix = "_strict" if args.strict else ""
+    summary_file = results_dir / f"summary{suffix}.csv"
+    details_file = results_dir / f"details{suffix}.csv"
+    errors_file = results_dir / f"errors{suffix}.csv"
+    watcher = DropWatcher(input_path, results_dir / f"watch_index{suffix}.json", settle=args.settle)
+    print(f"👀 Watching {input_path} (poll every {args.poll:g}s, {len(watcher.files)} files already indexed)")
+
+    cycles = processed = 0
+    try:
+        while True:
+            ready = watcher.poll()
+            if ready:
+                summary_rows, detail_rows, error_rows, failed = [], [], [], []
+                for f, res in iter_results(iter_inputs(ready), process_file, args, telemetry, strict=args.strict, rules=args.rules):
+                    if "error" in res:
+                        print(f"⚠️ Skipping {f.name}: {res['error']}")
+                        error_rows.append(error_row(res))
+                        if isinstance(f, Path) and res.get("stage") == "load" and not res.get("timed_out"):
+                            failed.append(f)  # likely still being written; retried when it changes
+                        continue
+                    summary_rows.append(summary_row(res))
+                    detail_rows.extend(detail_rows_for(res))
+                    if rollups is not None:
+                        add_rollup(rollups, f, res, input_path, args.rollup_path)
+                append_csv(summary_file, SUMMARY_FIELDS, summary_rows)
+                append_csv(details_file, DETAIL_FIELDS, detail_rows)
+                append_csv(errors_file, ERROR_FIELDS, error_rows)
+                if rollups is not None:
+                    rollups.flush()
+                # index only after the rows are on disk, so a crash re-processes rather than drops
+                watcher.mark_done(ready, failed)
+                watcher.save()
+                processed += len(ready)
+                print(f"✅ Appended {len(summary_rows)} calls to {summary_file}"
+                      f"{f' ({len(error_rows)} failed)' if error_rows else ''}")
+            cycles += 1
+            if args.watch_cycles and cycles >= args.watch_cycles:
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        print("👋 Stopped watching")
+    watcher.save()
+    return processed
+
+def in_call_id_order(*row_lists):
+    """
+    Stable-sort output rows by call id (their first column), the order
+    merge_csv restores from shards. Per-call files already arrive in that
+    order; records of a bulk file arrive in line order and are moved here,
+    so a sharded run merges back into the same files.
+    """
+    for rows in row_lists:
+        rows.sort(key=lambda r: str(next(iter(r.values()), "")))
+
+def error_row(res):
+    return {
+        "call_id": res.get("call_id", ""),
+        "stage": res.get("stage") or "",
+        "timed_out": "Yes" if res.get("timed_out") else "No",
+        "error": res.get("error", "")
+    }
+
+def write_errors(errors_file, error_rows):
+    """Write failed/timed-out files so they can be re-queued after the run."""
+    if not error_rows:
+        return
+    try:
+        with open(errors_file, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, ["call_id", "stage", "timed_out", "error"])
+            writer.writeheader()
+            writer.writerows(error_rows)
+        print(f"⚠️ {len(error_rows)} failed files recorded in {errors_file}")
+    except Exception as e:
+        print(f"❌ Error writing errors CSV: {str(e)}")
+
+def merge_results(args):
+    """Combine shard output directories into one result set (--merge)."""
+    shard_dirs = find_shard_dirs(args.merge)
+    missing = missing_shards(shard_dirs)
+    if missing:
+        print(f"❌ Missing shard outputs: {', '.join(missing)}")
+        return
+
+    results_dir = Path(args.output_dir)
+    merged = merge_shards(shard_dirs, results_dir)
+    if not merged:
+        print(f"⚠️ No shard outputs found in {', '.join(args.merge)}")
+        return
+
+    for name, count in merged.items():
+        print(f"✅ Merged {count} rows into {results_dir / name}")
+        # Excel is only produced for summary/details, as in a single-node run
+        if not args.no_excel and excel_support() and not name.startswith("errors"):
+            excel_file = str(results_dir / name).replace('.csv', '.xlsx')
+            if create_formatted_excel(results_dir / name, excel_file):
+                print(f"✅ Formatted Excel saved to {Path(excel_file).name}")
+
+def verify_engines(args, items, results_dir):
+    """
+    Differential check (--verify): run the reference detectors/metrics and
+    every candidate engine on each file and report per-call differences.
+    Returns the number of calls with differences.
+    """
+    from src.equivalence import ENGINES, load_golden, verify_call
+
+    engines = ENGINES
+    if args.engines:
+        names = [n.strip() for n in args.engines.split(",") if n.strip()]
+        unknown = [n for n in names if n not in ENGINES]
+        if unknown:
+            print(f"❌ Unknown engines: {', '.join(unknown)} (available: {', '.join(ENGINES)})")
+            return -1
+        engines = {n: ENGINES[n] for n in names}
+    golden = load_golden(args.golden) if args.golden else {}
+
+    diff_rows = []
+    differing = set()
+    checked_golden = 0
+    checked = 0
+    for f in items:
+        try:
+            utt = load_input(f, compact=True)
+        except Exception as e:
+            print(f"⚠️ Skipping {f.name}: {str(e)}")
+            continue
+        checked += 1
+        gold = golden.get(f.stem)
+        checked_golden += gold is not None
+        rows = verify_call(utt, f.stem, strict=args.strict, engines=engines, golden=gold,
+                           pct_tol=args.pct_tol, time_tol=args.time_tol)
+        if rows:
+            differing.add(f.stem)
+            diff_rows.extend(rows)
+
+    verify_file = results_dir / ("verify_strict.csv" if args.strict else "verify.csv")
+    with open(verify_file, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, ["call_id", "engine", "field", "expected", "actual"])
+        writer.writeheader()
+        writer.writerows(diff_rows)
+
+    print(f"🔬 Engines checked against reference: {', '.join(engines) or '(none)'}")
+    if golden:
+        print(f"🔬 Golden fixture calls found in input: {checked_golden} of {len(golden)}")
+    if differing:
+        print(f"❌ {len(differing)} of {checked} calls differ ({len(diff_rows)} fields); see {verify_file}")
+    else:
+        print(f"✅ No differences in {checked} calls; report written to {verify_file}")
+    return len(differing)
+
+def sample_corpus(args, files, input_path, results_dir, telemetry):
+    """
+    Estimate corpus-level rates and metric means from a stratified random
+    sample (--sample), stopping once every confidence interval is within
+    the target precision or --sample_size files have been analyzed.
+    Returns the number of files analyzed (including failed ones).
+    """
+    from src.sampling import StratifiedEstimator, sample_order, stratify
+
+    strata = stratify(files, by=args.sample_by, root=input_path)
+    est = StratifiedEstimator({s: len(fs) for s, fs in strata.items()}, confidence=args.confidence)
+    order = sample_order(strata, seed=args.seed)
+    limit = min(args.sample_size, len(files))
+    stopped_early = False
+
+    while est.n + est.errors < limit:
+        batch = []
+        for stratum, f in order:
+            batch.append((stratum, f))
+            if len(batch) >= min(args.sample_batch, limit - est.n - est.errors):
+                break
+        if not batch:
+            break
+        stratum_of = dict((f, s) for s, f in batch)
+        for f, res in iter_results([f for _, f in batch], process_file, args, telemetry, strict=args.strict, rules=args.rules):
+            est.add(stratum_of[f], res)
+        if est.n >= args.min_sample and est.precise_enough(args.precision, args.mean_precision):
+            stopped_early = est.n + est.errors < limit
+            break
+
+    report = est.report()
+    report.update({"seed": args.seed, "stratified_by": args.sample_by, "strict": args.strict,
+                   "precision": args.precision, "mean_precision": args.mean_precision,
+                   "stopped_early": stopped_early})
+    report_file = results_dir / ("sample_estimate_strict.json" if args.strict else "sample_estimate.json")
+    with open(report_file, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+    pct = args.confidence * 100
+    print(f"🎯 Sampled {est.n} of {len(files)} files across {len(strata)} strata"
+          f"{' (target precision reached)' if stopped_early else ''}")
+    for name, e in report["estimates"].items():
+        if e["estimate"] is None:
+            print(f"   {name}: no data")
+            continue
+        scale = 100.0 if name.endswith("_rate") else 1.0  # rates are proportions, means already in %
+        if e["ci_low"] is None:
+            print(f"   {name}: {e['estimate'] * scale:.2f}% (CI unavailable: not every stratum sampled)")
+        else:
+            print(f"   {name}: {e['estimate'] * scale:.2f}% "
+                  f"({pct:g}% CI {e['ci_low'] * scale:.2f}–{e['ci_high'] * scale:.2f}%)")
+    print(f"✅ Estimates saved to {report_file}")
+    return est.n + est.errors
+
 def create_formatted_excel(csv_path, excel_path):
     """Create a formatted Excel file from a CSV file."""
-    if not EXCEL_SUPPORT:
+    if not excel_support():
         return False
-        
+    import pandas as pd
+    import openpyxl
+    from openpyxl.styles import Alignment
+
     try:
         # Read CSV into pandas
         df = pd.read_csv(csv_path)
@@ -101,60 +531,246 @@ def create_formatted_excel(csv_path, excel_path):
 
 def main():
     ap = argparse.ArgumentParser(description="Batch process call transcripts")
-    ap.add_argument("--input_dir", required=True, help="Directory containing JSON/YAML files")
+    ap.add_argument("--input_dir", help="Directory containing JSON/YAML files")
+    ap.add_argument("--output_dir", default="results", help="Directory for result files (default: results)")
     ap.add_argument("--strict", action="store_true", help="Enable strict compliance verification")
     ap.add_argument("--profanity", action="store_true", help="Only check for profanity (skip compliance checks)")
     ap.add_argument("--no_excel", action="store_true", help="Skip Excel file generation")
+    ap.add_argument("--timeout", type=float, default=None, help="Per-file wall-time budget in seconds (runs files in worker processes)")
+    ap.add_argument("--max_memory_mb", type=int, default=None, help="Per-file memory budget in MB (runs files in worker processes)")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes for --timeout/--max_memory_mb (default: CPU count)")
+    ap.add_argument("--shard", help="Only process shard i/N of the corpus (0-based, by hash of call_id); outputs go to <output_dir>/shard_i_of_N")
+    ap.add_argument("--cache_size", type=int, default=100_000, help="Distinct utterance texts kept in the cross-call match cache (0 disables)")
+    ap.add_argument("--verify", action="store_true", help="Compare faster engines against the reference detectors/metrics instead of writing results")
+    ap.add_argument("--engines", help="Comma-separated engines to check with --verify (default: all registered)")
+    ap.add_argument("--golden", default="results_compliance.csv", help="Golden results fixture checked with --verify (default: results_compliance.csv)")
+    ap.add_argument("--pct_tol", type=float, default=1e-6, help="--verify tolerance for percentages, in percentage points")
+    ap.add_argument("--time_tol", type=float, default=1e-6, help="--verify tolerance for times, in seconds")
+    ap.add_argument("--metrics_port", type=int, help="Expose Prometheus metrics on http://127.0.0.1:PORT/metrics during the run")
+    ap.add_argument("--metrics_file", help="Write Prometheus metrics to this textfile periodically and at the end of the run")
+    ap.add_argument("--metrics_interval", type=float, default=15.0, help="Seconds between --metrics_file writes (default: 15)")
+    ap.add_argument("--sample", action="store_true", help="Estimate rates/means from a stratified random sample instead of analyzing every file")
+    ap.add_argument("--sample_by", choices=["folder", "size"], default="folder", help="Sampling strata: source folder or file-size quartile (default: folder)")
+    ap.add_argument("--sample_size", type=int, default=2000, help="Most files to analyze with --sample (default: 2000)")
+    ap.add_argument("--sample_batch", type=int, default=50, help="Files analyzed between precision checks (default: 50)")
+    ap.add_argument("--min_sample", type=int, default=100, help="Files analyzed before early stopping is allowed (default: 100)")
+    ap.add_argument("--precision", type=float, default=0.01, help="Target CI half-width for rates, as a proportion (default: 0.01 = ±1 point)")
+    ap.add_argument("--mean_precision", type=float, default=0.5, help="Target CI half-width for overtalk/silence means, in percentage points (default: 0.5)")
+    ap.add_argument("--confidence", type=float, default=0.95, help="Confidence level for --sample intervals (default: 0.95)")
+    ap.add_argument("--seed", type=int, default=0, help="Random seed for --sample (default: 0)")
+    ap.add_argument("--rules", help="Compliance rules file (JSON/YAML, e.g. patterns/compliance_rules.json); default: disclosure after verification")
+    ap.add_argument("--engine", choices=["default", "frame"], default="default", help="Analysis engine: per-call (default) or 'frame', whole batches as one pandas table")
+    ap.add_argument("--frame_batch", type=int, default=5000, help="Calls per table with --engine frame (default: 5000)")
+    ap.add_argument("--watch", action="store_true", help="Keep running and process new transcripts as they land in --input_dir, appending to the outputs")
+    ap.add_argument("--poll", type=float, default=2.0, help="Seconds between --watch polls (default: 2)")
+    ap.add_argument("--settle", type=float, default=2.0, help="Seconds a new file must stay unchanged before --watch processes it (default: 2)")
+    ap.add_argument("--watch_cycles", type=int, default=0, help="Stop --watch after this many polls (default: 0, run until interrupted)")
+    ap.add_argument("--rollups", action="store_true", help="Maintain per-agent/team/day rollup partials in <output_dir>/rollups as calls finish")
+    ap.add_argument("--rollup_path", metavar="REGEX", help="Regex with named groups agent/team/day matched against each file's input-relative path, for calls whose metadata lacks them")
+    ap.add_argument("--report_rollups", metavar="DIMS", help="Write rollup_<dims>.csv from the stored partials (e.g. agent, team, day or agent,day) instead of processing files")
+    ap.add_argument("--since", help="First day (YYYY-MM-DD) included by --report_rollups")
+    ap.add_argument("--until", help="Last day (YYYY-MM-DD) included by --report_rollups")
+    ap.add_argument("--export_html", action="store_true", help="Also write static HTML pages (timeline + talk share charts) for flagged calls to <output_dir>/report")
+    ap.add_argument("--export_workers", type=int, default=None, help="Worker processes rendering --export_html pages (default: CPU count)")
+    ap.add_argument("--prefetch", type=int, default=0, metavar="DEPTH", help="Read up to DEPTH files ahead of the analysis on background threads, for high-latency storage such as NFS (default: 0, off)")
+    ap.add_argument("--io_threads", type=int, default=8, help="Reader threads for --prefetch (default: 8)")
+    ap.add_argument("--merge", nargs="+", metavar="DIR", help="Merge shard output directories into --output_dir instead of processing files")
     args = ap.parse_args()
 
+    if args.merge:
+        merge_results(args)
+        return
+    if args.report_rollups:
+        report_rollups(args)
+        return
+    if not args.input_dir:
+        ap.error("--input_dir is required unless --merge or --report_rollups is given")
+    if args.rollup_path:
+        try:
+            args.rollup_path = re.compile(args.rollup_path)
+        except re.error as e:
+            ap.error(f"--rollup_path: {e}")
+    if args.rollups and (args.profanity or args.sample or args.verify):
+        print("❌ --rollups aggregates the standard analysis; it cannot be combined with --profanity, --sample or --verify")
+        sys.exit(2)
+    if args.export_html:
+        if args.profanity or args.sample or args.verify or args.watch:
+            print("❌ --export_html renders the standard analysis of a batch run; it cannot be combined with --profanity, --sample, --verify or --watch")
+            sys.exit(2)
+        if importlib.util.find_spec("plotly") is None:
+            print("❌ --export_html needs plotly (pip install -r requirements.txt)")
+            sys.exit(2)
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            ap.error(str(e))
+
     input_path = Path(args.input_dir)
-    results_dir = Path("results")
-    results_dir.mkdir(exist_ok=True)
+    results_dir = Path(args.output_dir)
+    if shard:
+        results_dir = results_dir / shard_dir_name(*shard)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    match_cache.configure(args.cache_size)
+    if args.rules:
+        try:
+            ruleset = get_ruleset(args.rules)
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid rules file {args.rules}: {e}")
+            sys.exit(2)
+        print(f"📋 Loaded {len(ruleset.rules)} compliance rules from {args.rules}")
+
+    if args.engine == "frame":
+        conflicts = [flag for flag, on in (("--profanity", args.profanity), ("--rules", args.rules), ("--timeout", args.timeout),
+                                           ("--max_memory_mb", args.max_memory_mb), ("--watch", args.watch),
+                                           ("--sample", args.sample)) if on]
+        if conflicts:
+            print(f"❌ --engine frame runs the standard analysis in-process; it cannot be combined with {', '.join(conflicts)}")
+            sys.exit(2)
+        if importlib.util.find_spec("pandas") is None or importlib.util.find_spec("numpy") is None:
+            print("❌ --engine frame needs pandas and numpy (pip install -r requirements.txt)")
+            sys.exit(2)
+
+    if args.watch:
+        if args.profanity or args.sample or args.verify or shard:
+            print("❌ --watch runs the standard analysis; it cannot be combined with --profanity, --sample, --verify or --shard")
+            sys.exit(2)
+        telemetry = AnalyzerMetrics()
+        exporter = None
+        if args.metrics_port:
+            start_http_exporter(telemetry.registry, args.metrics_port)
+            print(f"📈 Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+        if args.metrics_file:
+            exporter = TextfileExporter(telemetry.registry, args.metrics_file, args.metrics_interval)
+        try:
+            processed = watch_input(args, input_path, results_dir, telemetry,
+                                    open_rollups(args, input_path) if args.rollups else None)
+        finally:
+            if exporter is not None:
+                exporter.stop()
+        print(f"📊 Processed {processed} files")
+        return
 
     files = list(input_path.glob("**/*.json")) + list(input_path.glob("**/*.yaml")) + list(input_path.glob("**/*.yml"))
-    
+    files += [f for f in input_path.glob("**/*") if f.is_file() and is_bulk_file(f)]
+    # deterministic order (by call_id) so sharded runs merge back identically
+    files.sort(key=lambda f: (f.stem, str(f)))
+    if shard:
+        # bulk files hold many calls; their records are sharded one by one (iter_inputs)
+        files = [f for f in files if is_bulk_file(f) or shard_of(f.stem, shard[1]) == shard[0]]
+
     if not files:
-        print(f"⚠️ No JSON/YAML files found in {input_path}")
+        print(f"⚠️ No JSON/YAML/NDJSON files found in {input_path}")
         return
 
+    if args.verify:
+        if verify_engines(args, iter_inputs(files, shard), results_dir):
+            sys.exit(1)
+        return
+
+    telemetry = AnalyzerMetrics()
+    telemetry.files_total.set(sum(1 for f in files if not is_bulk_file(f)))
+    exporter = None
+    prefetcher = None
+    if args.metrics_port:
+        start_http_exporter(telemetry.registry, args.metrics_port)
+        print(f"📈 Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.metrics_file:
+        exporter = TextfileExporter(telemetry.registry, args.metrics_file, args.metrics_interval)
+    try:
+        if args.sample:
+            bulk = [f for f in files if is_bulk_file(f)]
+            if bulk:
+                print(f"⚠️ --sample draws from per-call files only; skipping {len(bulk)} bulk file(s)")
+            files = [f for f in files if not is_bulk_file(f)]
+            processed = sample_corpus(args, files, input_path, results_dir, telemetry)
+        else:
+            rollups = open_rollups(args, input_path, shard) if args.rollups else None
+            report = None
+            if args.export_html:
+                from src.report_export import ReportExporter
+                report = ReportExporter(results_dir / "report", workers=args.export_workers)
+            items = iter_inputs(files, shard, telemetry)
+            if args.prefetch:
+                from src.prefetch import Prefetcher
+                prefetcher = Prefetcher(args.prefetch, args.io_threads, registry=telemetry.registry)
+                items = prefetcher(items)
+            processed = write_results(args, items, results_dir, telemetry,
+                                      rollups=rollups, input_path=input_path, report=report)
+            if rollups is not None:
+                rollups.flush()
+                print(f"📈 Rollup partials updated in {rollups.root}")
+            if report is not None:
+                index = report.close()
+                for call_id, error in report.failed.values():
+                    print(f"⚠️ No report page for {call_id}: {error}")
+                print(f"✅ Report for {len(report.rows)} flagged calls saved to {index}")
+    finally:
+        if exporter is not None:
+            exporter.stop()
+            print(f"📈 Metrics written to {args.metrics_file}")
+
+    # Summary statistics
+    print(f"📊 Processed {processed} files")
+    if prefetcher is not None:
+        io = prefetcher.stats()
+        streamed = f", {io['streamed']} large files streamed" if io["streamed"] else ""
+        print(f"💾 Prefetch (depth {prefetcher.depth}, {prefetcher.threads} threads): waited {io['io_wait_seconds']:.2f}s for I/O, "
+              f"{io['compute_seconds']:.2f}s computing; {io['files']} files ({io['bytes'] / 1e6:.1f} MB) read ahead{streamed}")
+    cache = match_cache.DEFAULT_CACHE.stats()
+    if cache["hits"] + cache["misses"]:  # worker processes keep their own caches
+        print(f"🧠 Match cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%} hit rate)")
+
+def write_results(args, files, results_dir, telemetry, rollups=None, input_path=None, report=None):
+    """
+    Analyze every file (or bulk record) and write the summary/details/errors
+    outputs for the selected mode. Returns the number of calls processed.
+    Successful calls are also added to `rollups` (a RollupStore) and, when
+    flagged, queued on `report` (a ReportExporter), if given.
+    """
     # Process all files
     if args.profanity:
         # PROFANITY MODE - Special format for profanity detection
         summary_rows = []
         detail_rows = []  # Add this line to collect detail rows
 
-        for f in files:
-            try:
-                # Load file and run profanity detection directly
-                utt = load_file(f)
-                prof = detect_profanity(utt)
-                
-                # Calculate metrics
-                ot = overtalk_percentage(utt)
-                si = silence_percentage(utt)
-                
-                # Format as seen in results_profanity.csv
-                flag = "Yes" if (prof.get("agent_has", False) or prof.get("borrower_has", False)) else "No"
-                summary_rows.append({
+        error_rows = []
+
+        for f, res in iter_results(files, process_profanity_file, args, telemetry):
+            if "error" in res:
+                print(f"⚠️ Skipping {f.name}: {res['error']}")
+                error_rows.append(error_row(res))
+                continue
+
+            prof = res["prof_details"]
+            ot = res["raw_metrics"]["overtalk"]
+            si = res["raw_metrics"]["silence"]
+
+            # Format as seen in results_profanity.csv
+            flag = "Yes" if (prof.get("agent_has", False) or prof.get("borrower_has", False)) else "No"
+            summary_rows.append({
+                "call_id": f.stem,
+                "flag": flag,
+                "overtalk_pct": ot,
+                "silence_pct": si,
+                "details": json.dumps(prof)
+            })
+
+            # Add details for each profanity hit
+            for hit in prof.get("hits", []):
+                detail_rows.append({
                     "call_id": f.stem,
-                    "flag": flag,
-                    "overtalk_pct": ot,
-                    "silence_pct": si,
-                    "details": json.dumps(prof)
+                    "speaker": hit.get("speaker", ""),
+                    "text": hit.get("text", ""),
+                    "time": f"{hit.get('stime', 0):.1f}s",
+                    "matches": ", ".join(hit.get("matches", []))
                 })
-                
-                # Add details for each profanity hit
-                for hit in prof.get("hits", []):
-                    detail_rows.append({
-                        "call_id": f.stem,
-                        "speaker": hit.get("speaker", ""),
-                        "text": hit.get("text", ""),
-                        "time": f"{hit.get('stime', 0):.1f}s",
-                        "matches": ", ".join(hit.get("matches", []))
-                    })
-            except Exception as e:
-                print(f"⚠️ Skipping {f.name}: {str(e)}")
-        
+
+        in_call_id_order(summary_rows, detail_rows, error_rows)
+        write_errors(results_dir / "errors_profanity.csv", error_rows)
+
         # Write profanity CSV
         if summary_rows:
             summary_file = results_dir / "summary_profanity.csv"
@@ -166,7 +782,7 @@ def main():
             print(f"✅ Profanity summary saved to {summary_file}")
             
             # Create Excel if requested
-            if EXCEL_SUPPORT and not args.no_excel:
+            if not args.no_excel and excel_support():
                 excel_summary_file = str(summary_file).replace('.csv', '.xlsx')
                 if create_formatted_excel(summary_file, excel_summary_file):
                     print(f"✅ Formatted Excel saved to {Path(excel_summary_file).name}")
@@ -182,7 +798,7 @@ def main():
             print(f"✅ Profanity details saved to {details_file}")
             
             # Create Excel if requested
-            if EXCEL_SUPPORT and not args.no_excel:
+            if not args.no_excel and excel_support():
                 excel_details_file = str(details_file).replace('.csv', '.xlsx')
                 if create_formatted_excel(details_file, excel_details_file):
                     print(f"✅ Formatted Excel saved to {Path(excel_details_file).name}")
@@ -190,52 +806,31 @@ def main():
         # STANDARD MODE - Full analysis
         summary_rows = []
         detail_rows = []
-        
-        for f in files:
-            # Process each file
-            res = process_file(f, strict=args.strict)
-            
+        error_rows = []
+
+        if args.engine == "frame":
+            results = iter_frame_results(files, args, telemetry)
+        else:
+            results = iter_results(files, process_file, args, telemetry, strict=args.strict, rules=args.rules)
+        for f, res in results:
             if "error" in res:
                 print(f"⚠️ Skipping {f.name}: {res['error']}")
+                error_rows.append(error_row(res))
                 continue
             
-            # Add to summary rows
-            summary_rows.append({
-                "File (Call ID)": res["call_id"],
-                "Agent Profanity": res["agent_prof"],
-                "Borrower Profanity": res["borrower_prof"],
-                "Compliance Violation": res["compliance_violation"],
-                "Overtalk %": res["overtalk_pct"],
-                "Silence %": res["silence_pct"],
-                "Total Time": res["total_time"],
-                "Agent Talk %": res["agent_share"],
-                "Borrower Talk %": res["borrower_share"]
-            })
+            summary_rows.append(summary_row(res))
+            detail_rows.extend(detail_rows_for(res))
+            if rollups is not None:
+                add_rollup(rollups, f, res, input_path, args.rollup_path)
+            if report is not None:
+                report.add(f, res)
 
-            # Add details for profanity
-            for hit in res["prof_details"].get("hits", []):
-                detail_rows.append({
-                    "File (Call ID)": res["call_id"],
-                    "Type": "Profanity",
-                    "Speaker": hit.get("speaker", ""),
-                    "Text": hit.get("text", ""),
-                    "Matches": ", ".join(hit.get("matches", []))
-                })
-
-            # Add details for compliance violations
-            ev = res["comp_details"].get("evidence", {})
-            if isinstance(ev, dict) and ev.get("reason"):
-                detail_rows.append({
-                    "File (Call ID)": res["call_id"],
-                    "Type": "Compliance",
-                    "Speaker": "agent",
-                    "Text": ev.get("reason", ""),
-                    "Matches": json.dumps(ev.get("examples", []))
-                })
+        in_call_id_order(summary_rows, detail_rows, error_rows)
 
         # Determine output filenames based on mode
         summary_file = results_dir / ("summary_strict.csv" if args.strict else "summary.csv")
         details_file = results_dir / ("details_strict.csv" if args.strict else "details.csv")
+        write_errors(results_dir / ("errors_strict.csv" if args.strict else "errors.csv"), error_rows)
 
         # Write summary CSV
         try:
@@ -248,7 +843,7 @@ def main():
                 print(f"✅ Summary saved to {summary_file}")
                 
                 # Create Excel if requested
-                if EXCEL_SUPPORT and not args.no_excel:
+                if not args.no_excel and excel_support():
                     excel_summary_file = str(summary_file).replace('.csv', '.xlsx')
                     if create_formatted_excel(summary_file, excel_summary_file):
                         print(f"✅ Formatted Excel saved to {Path(excel_summary_file).name}")
@@ -268,7 +863,7 @@ def main():
                 print(f"✅ Details saved to {details_file}")
                 
                 # Create Excel if requested
-                if EXCEL_SUPPORT and not args.no_excel:
+                if not args.no_excel and excel_support():
                     excel_details_file = str(details_file).replace('.csv', '.xlsx')
                     if create_formatted_excel(details_file, excel_details_file):
                         print(f"✅ Formatted Excel saved to {Path(excel_details_file).name}")
@@ -277,8 +872,8 @@ def main():
         except Exception as e:
             print(f"❌ Error writing details CSV: {str(e)}")
 
-    # Summary statistics
-    print(f"📊 Processed {len(files)} files")
+    return len(summary_rows) + len(error_rows)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,30 @@
+# run_service.py
+import argparse
+from src.service import make_server
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve call analysis over local HTTP with warm patterns")
+    ap.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    ap.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    ap.add_argument("--socket", help="Serve on this Unix socket path instead of TCP")
+    ap.add_argument("--workers", type=int, default=1, help="Analysis processes (default: 1, in-process)")
+    ap.add_argument("--max_batch", type=int, default=64, help="Most calls analyzed per micro-batch")
+    ap.add_argument("--max_wait_ms", type=float, default=2.0, help="How long a micro-batch waits for more calls")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+
+    server = make_server(host=args.host, port=args.port, unix_socket=args.socket,
+                         max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0,
+                         workers=args.workers, verbose=args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"✅ Call analyzer listening on {where} (POST /analyze, GET /health, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+if __name__ == "__main__":
+    main()
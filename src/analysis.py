@@ -0,0 +1,53 @@
+# Per-call analysis shared by the batch CLI and the analysis service
+# src/analysis.py
+from typing import List, Dict, Any
+from .profanity import detect_profanity, get_profanity_patterns
+from .pii_compliance import detect_compliance_violation, get_pii_patterns
+from .metrics import overtalk_percentage, silence_percentage, talk_share
+
+def noop_stage(name):
+    pass
+
+def warm_patterns():
+    """Load the default pattern files now, e.g. before forking workers."""
+    get_profanity_patterns()
+    get_pii_patterns()
+
+def analyze_utterances(utt: List[Dict[str, Any]], call_id: str, strict=False, on_stage=noop_stage,
+                       rules=None) -> Dict[str, Any]:
+    """Run metrics and detectors on loaded utterances; same result shape as run_batch.process_file."""
+    # Calculate metrics
+    on_stage("metrics")
+    ot = overtalk_percentage(utt)
+    si = silence_percentage(utt)
+    tt = talk_share(utt)
+
+    # Run detection
+    on_stage("profanity")
+    prof = detect_profanity(utt)
+    on_stage("compliance")
+    comp = detect_compliance_violation(utt, strict=strict, rules=rules)
+
+    return build_result(call_id, prof, comp, ot, si, tt, len(utt))
+
+def build_result(call_id: str, prof: Dict[str, Any], comp: Dict[str, Any], ot: float, si: float,
+                 tt: Dict[str, float], n_utterances: int) -> Dict[str, Any]:
+    """Assemble the process_file-shaped result from detector/metric outputs."""
+    return {
+        "call_id": call_id,
+        "agent_prof": "Yes" if prof.get("agent_has") else "No",
+        "borrower_prof": "Yes" if prof.get("borrower_has") else "No",
+        "compliance_violation": "Yes" if comp.get("violation") else "No",
+        "overtalk_pct": f"{ot:.2f}%",
+        "silence_pct": f"{si:.2f}%",
+        "total_time": f"{tt['total']:.1f}s",
+        "agent_share": f"{tt['agent_pct']:.1f}%",
+        "borrower_share": f"{tt['borrower_pct']:.1f}%",
+        "prof_details": prof,
+        "comp_details": comp,
+        "raw_metrics": {
+            "overtalk": ot,
+            "silence": si,
+            "utterances": n_utterances
+        }
+    }
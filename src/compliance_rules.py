@@ -0,0 +1,265 @@
+# Declarative compliance rules compiled into a single-pass timeline check
+# src/compliance_rules.py
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .match_cache import DEFAULT_CACHE, MatchCache
+
+# Rule types (all times are utterance start times, in timeline order):
+#   after        {"event": E, "requires": R}  E must not occur before R has (or at all without R)
+#   within       {"event": E, "seconds": S}   E must occur within S seconds of the call's first utterance
+#   never_after  {"event": E, "trigger": T}   E must not occur once T has occurred
+RULE_TYPES = ('after', 'within', 'never_after')
+
+# Events are either matched ({"speaker": "agent"|"borrower"|null, "patterns": [...]}) or
+# derived from other events at the end of the call:
+#   {"first_of": [A, B]}             A's first occurrence, else B's
+#   {"strict_sequence": [A, B]}      with strict=True: B's first occurrence, if not before A's
+
+
+def load_rules(path) -> Dict[str, Any]:
+    """Read a rules file, JSON or (by extension) YAML: {"events": {...}, "rules": [...]}."""
+    p = Path(path)
+    # If not found, try relative to the repository root (like the pattern files)
+    if not p.exists():
+        p = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / path
+    text = p.read_text(encoding='utf-8')
+    if p.suffix.lower() in ('.yaml', '.yml'):
+        import yaml
+        return yaml.safe_load(text) or {}
+    return json.loads(text)
+
+
+def _compile(pattern) -> re.Pattern:
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(pattern), re.IGNORECASE)
+
+
+def _label(events: Dict[str, Dict[str, Any]], name: str) -> str:
+    return events.get(name, {}).get('label') or name.replace('_', ' ')
+
+
+def _cap(s: str) -> str:
+    return s[:1].upper() + s[1:]
+
+
+class RuleSet:
+    """
+    A set of rules compiled for one pass over a call.
+
+    Every matched event used by any rule is folded into one pattern list per
+    speaker, so each utterance costs a single (cached) match lookup no
+    matter how many rules there are. The pass walks the call in start-time
+    order, records the first occurrence of every event by utterance index,
+    and advances the never_after rules as their triggers fire; it stops as
+    soon as nothing can change any more. after/within rules and derived
+    events are then decided from the recorded indices. The first rule is the
+    primary one: its evidence is the call's `evidence`.
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], events: Dict[str, Dict[str, Any]]):
+        if not rules:
+            raise ValueError("A rule set needs at least one rule")
+        self.events = {name: dict(ev) for name, ev in events.items()}
+        self.rules = [dict(r) for r in rules]
+        seen = set()
+        for i, rule in enumerate(self.rules):
+            rule.setdefault('name', f"rule_{i + 1}")
+            if rule['name'] in seen:
+                raise ValueError(f"Duplicate rule name '{rule['name']}'")
+            seen.add(rule['name'])
+            kind = rule.get('type')
+            if kind not in RULE_TYPES:
+                raise ValueError(f"Rule '{rule['name']}': unknown type {kind!r}, expected one of {RULE_TYPES}")
+            other = {'after': 'requires', 'within': 'seconds', 'never_after': 'trigger'}[kind]
+            if 'event' not in rule or other not in rule:
+                raise ValueError(f"Rule '{rule['name']}' ({kind}) needs 'event' and '{other}'")
+            refs = [rule['event']] + ([] if kind == 'within' else [rule[other]])
+            for ref in refs:
+                self._check_event(ref)
+                if kind == 'never_after' and self._is_derived(ref):
+                    raise ValueError(f"Rule '{rule['name']}': never_after needs matched events, '{ref}' is derived")
+
+        # matched events the rules depend on, and their compiled patterns
+        self._matched: Dict[str, Tuple[Optional[str], List[re.Pattern]]] = {}
+        for rule in self.rules:
+            for ref in (rule['event'], rule.get('requires'), rule.get('trigger')):
+                if ref is not None:
+                    self._collect(ref)
+        self._online = [i for i, r in enumerate(self.rules) if r['type'] == 'never_after']
+        self._plans: Dict[str, Optional[Tuple[List[re.Pattern], Dict[str, Tuple[str, ...]]]]] = {}
+
+    def _is_derived(self, name: str) -> bool:
+        ev = self.events[name]
+        return 'first_of' in ev or 'strict_sequence' in ev
+
+    def _check_event(self, name: str, stack: Tuple[str, ...] = ()):
+        if name not in self.events:
+            raise ValueError(f"Unknown event '{name}'")
+        if name in stack:
+            raise ValueError(f"Event '{name}' is defined in terms of itself")
+        ev = self.events[name]
+        if self._is_derived(name):
+            for part in list(ev.get('first_of', [])) + list(ev.get('strict_sequence', [])):
+                self._check_event(part, stack + (name,))
+            if len(ev.get('strict_sequence', [None, None])) != 2:
+                raise ValueError(f"Event '{name}': strict_sequence takes exactly two events")
+        elif not ev.get('patterns'):
+            raise ValueError(f"Event '{name}' has no patterns")
+
+    def _collect(self, name: str):
+        if self._is_derived(name):
+            ev = self.events[name]
+            for part in list(ev.get('first_of', [])) + list(ev.get('strict_sequence', [])):
+                self._collect(part)
+        elif name not in self._matched:
+            ev = self.events[name]
+            speaker = ev.get('speaker')
+            self._matched[name] = (speaker.lower() if speaker else None, [_compile(p) for p in ev['patterns']])
+
+    def _plan(self, speaker: str):
+        """(patterns, pattern source -> events) for one speaker; None if no event can match."""
+        plan = self._plans.get(speaker, False)
+        if plan is False:
+            patterns: List[re.Pattern] = []
+            owners: Dict[str, Tuple[str, ...]] = {}
+            for name, (who, pats) in self._matched.items():
+                if who is not None and who != speaker:
+                    continue
+                for p in pats:
+                    if p.pattern not in owners:
+                        patterns.append(p)
+                        owners[p.pattern] = ()
+                    owners[p.pattern] += (name,)
+            plan = self._plans[speaker] = (patterns, owners) if patterns else None
+        return plan
+
+    def evaluate(self, utterances: List[Dict[str, Any]], strict=False,
+                 cache: Optional[MatchCache] = None) -> Dict[str, Any]:
+        cache = DEFAULT_CACHE if cache is None else cache
+        starts = [float(u['stime']) for u in utterances]
+        if all(a <= b for a, b in zip(starts, starts[1:])):
+            order = range(len(utterances))
+        else:
+            order = sorted(range(len(utterances)), key=starts.__getitem__)
+
+        first: Dict[str, int] = {}
+        missing = set(self._matched)
+        # never_after state per rule: None (trigger not seen), or (trigger index, offending index or None)
+        state: Dict[int, Optional[Tuple[int, Optional[int]]]] = {k: None for k in self._online}
+        open_rules = set(self._online)
+        for i in order:
+            u = utterances[i]
+            plan = self._plan(str(u.get('speaker', '')).lower())
+            if plan is None:
+                continue
+            patterns, owners = plan
+            hits = cache.matches(u.get('text', ''), patterns)
+            if not hits:
+                continue
+            fired = set()
+            for src in hits:
+                fired.update(owners[src])
+            for k in list(open_rules):
+                rule = self.rules[k]
+                if state[k] is not None and rule['event'] in fired:
+                    state[k] = (state[k][0], i)
+                    open_rules.discard(k)
+            for name in fired:
+                if name not in first:
+                    first[name] = i
+                    missing.discard(name)
+            for k in open_rules:
+                if state[k] is None and self.rules[k]['trigger'] in fired:
+                    state[k] = (i, None)
+            if not missing and not open_rules:
+                break
+
+        call_start = starts[order[0]] if starts else None
+        results = {}
+        for k, rule in enumerate(self.rules):
+            results[rule['name']] = self._decide(rule, utterances, starts, first, state.get(k), strict, call_start)
+        primary = results[self.rules[0]['name']]
+        return {
+            'violation': any(r['violation'] for r in results.values()),
+            'evidence': primary['evidence'],
+            'rules': results,
+        }
+
+    def _resolve(self, name: str, first: Dict[str, int], starts: List[float], strict: bool) -> Optional[int]:
+        """Utterance index of an event's (first) occurrence, deriving composite events."""
+        ev = self.events[name]
+        if not self._is_derived(name):
+            return first.get(name)
+        if strict and 'strict_sequence' in ev:
+            a, b = (self._resolve(part, first, starts, strict) for part in ev['strict_sequence'])
+            if a is not None and b is not None and starts[b] >= starts[a]:
+                return b
+            return None
+        for part in ev.get('first_of', []):
+            i = self._resolve(part, first, starts, strict)
+            if i is not None:
+                return i
+        return None
+
+    def _decide(self, rule, utterances, starts, first, online, strict, call_start) -> Dict[str, Any]:
+        kind = rule['type']
+        event = rule['event']
+        label = _label(self.events, event)
+        violation = False
+        reason = None
+        marks: List[Tuple[int, str]] = []
+        if kind == 'after':
+            requires = rule['requires']
+            e = self._resolve(event, first, starts, strict)
+            r = self._resolve(requires, first, starts, strict)
+            te = starts[e] if e is not None else None
+            tr = starts[r] if r is not None else None
+            if te is not None and (tr is None or te < tr):
+                violation = True
+                if tr is None:
+                    reason = f"{_cap(label)} occurred and no prior {_label(self.events, requires)} detected."
+                else:
+                    reason = f"{_cap(label)} at {te:.2f}s before {_label(self.events, requires)} at {tr:.2f}s."
+            times = {f'{event}_time': te, f'{requires}_time': tr}
+            marks = [(e, event), (r, requires)]
+        elif kind == 'within':
+            seconds = float(rule['seconds'])
+            e = self._resolve(event, first, starts, strict)
+            te = starts[e] if e is not None else None
+            if call_start is not None:
+                if te is None:
+                    violation = True
+                    reason = f"{_cap(label)} not detected within the first {seconds:g}s."
+                elif te - call_start > seconds:
+                    violation = True
+                    reason = f"{_cap(label)} at {te:.2f}s, after the first {seconds:g}s."
+            times = {f'{event}_time': te}
+            marks = [(e, event)]
+        else:
+            trigger = rule['trigger']
+            t, e = online if online is not None else (None, None)
+            tt = starts[t] if t is not None else None
+            te = starts[e] if e is not None else None
+            if e is not None:
+                violation = True
+                reason = f"{_cap(label)} at {te:.2f}s after {_label(self.events, trigger)} at {tt:.2f}s."
+            times = {f'{event}_time': te, f'{trigger}_time': tt}
+            marks = [(e, event), (t, trigger)]
+
+        # evidence points at the utterances themselves, in call order
+        examples = []
+        for i, kind_name in sorted(((i, n) for i, n in marks if i is not None), key=lambda m: m[0]):
+            u = utterances[i]
+            examples.append({'type': kind_name, 'speaker': u['speaker'], 'text': u.get('text', ''), 'stime': starts[i]})
+        evidence = dict(times)
+        evidence['reason'] = reason
+        evidence['examples'] = examples
+        return {'type': kind, 'violation': violation, 'evidence': evidence}
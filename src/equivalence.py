@@ -0,0 +1,144 @@
+# Differential equivalence checks between the reference detectors and faster engines
+# src/equivalence.py
+import csv
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .profanity import detect_profanity
+from .pii_compliance import detect_compliance_violation, detect_compliance_violation_reference
+from .metrics import overtalk_percentage, silence_percentage, talk_share
+from .match_cache import MatchCache
+
+FLAG_FIELDS = ('agent_prof', 'borrower_prof', 'violation')
+TIME_FIELDS = ('disclose_time', 'verify_time', 'total')
+PCT_FIELDS = ('overtalk', 'silence', 'agent_pct', 'borrower_pct')
+
+# engine(utterances, strict) -> verdict dict with the fields above
+Engine = Callable[[List[Dict[str, Any]], bool], Dict[str, Any]]
+
+
+def verdict(prof, comp, ot, si, tt) -> Dict[str, Any]:
+    """Reduce detector/metric outputs to the comparable fields."""
+    ev = comp.get('evidence', {}) or {}
+    return {
+        'agent_prof': bool(prof.get('agent_has')),
+        'borrower_prof': bool(prof.get('borrower_has')),
+        'violation': bool(comp.get('violation')),
+        'disclose_time': ev.get('disclose_time'),
+        'verify_time': ev.get('verify_time'),
+        'overtalk': ot,
+        'silence': si,
+        'total': tt['total'],
+        'agent_pct': tt['agent_pct'],
+        'borrower_pct': tt['borrower_pct'],
+    }
+
+
+def reference_engine(utt, strict=False) -> Dict[str, Any]:
+    """The plain implementations: no match cache, no fast paths."""
+    nocache = MatchCache(maxsize=0)
+    return verdict(
+        detect_profanity(utt, cache=nocache),
+        detect_compliance_violation_reference(utt, strict=strict, cache=nocache),
+        overtalk_percentage(utt), silence_percentage(utt), talk_share(utt),
+    )
+
+
+def default_engine(utt, strict=False) -> Dict[str, Any]:
+    """What run_batch.py runs in production (shared match cache, compiled compliance rules)."""
+    return verdict(
+        detect_profanity(utt),
+        detect_compliance_violation(utt, strict=strict),
+        overtalk_percentage(utt), silence_percentage(utt), talk_share(utt),
+    )
+
+
+# candidate engines checked against reference_engine by `run_batch.py --verify`
+ENGINES: Dict[str, Engine] = {
+    'default': default_engine,
+}
+
+# the vectorized whole-corpus engine needs pandas/numpy; only offer it when they are installed
+if importlib.util.find_spec('pandas') and importlib.util.find_spec('numpy'):
+    from .frame_engine import frame_engine
+    ENGINES['frame'] = frame_engine
+
+
+def register_engine(name: str, engine: Engine):
+    ENGINES[name] = engine
+
+
+def compare(expected: Dict[str, Any], actual: Dict[str, Any],
+            pct_tol: float = 1e-6, time_tol: float = 1e-6) -> List[Tuple[str, Any, Any]]:
+    """(field, expected, actual) for every field present in `expected` that differs."""
+    diffs = []
+    for field, exp in expected.items():
+        act = actual.get(field)
+        if field in FLAG_FIELDS:
+            same = exp == act
+        elif exp is None or act is None:
+            same = exp is None and act is None
+        else:
+            tol = pct_tol if field in PCT_FIELDS else time_tol
+            same = abs(float(exp) - float(act)) <= tol
+        if not same:
+            diffs.append((field, exp, act))
+    return diffs
+
+
+def load_golden(path) -> Dict[str, Dict[str, Any]]:
+    """
+    Read a results_compliance.csv-style fixture into partial verdicts keyed by
+    call id (file stem): violation, overtalk, silence and evidence times.
+    """
+    golden = {}
+    p = Path(path)
+    # If not found, try relative to the repository root (like the pattern files)
+    if not p.exists():
+        p = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) / path
+    if not p.exists():
+        return golden
+    with open(p, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            ev = json.loads(row.get('details') or '{}').get('evidence', {}) or {}
+            golden[Path(row['call_id']).stem] = {
+                'violation': row['flag'].strip().lower() == 'true',
+                'overtalk': float(row['overtalk_pct']),
+                'silence': float(row['silence_pct']),
+                'disclose_time': ev.get('disclose_time'),
+                'verify_time': ev.get('verify_time'),
+            }
+    return golden
+
+
+def verify_call(utt, call_id: str, strict=False, engines: Optional[Dict[str, Engine]] = None,
+                golden: Optional[Dict[str, Any]] = None, pct_tol: float = 1e-6,
+                time_tol: float = 1e-6) -> List[Dict[str, Any]]:
+    """
+    Run the reference engine and each candidate on one call. Returns one
+    row per differing field; the golden fixture (if it has this call) is
+    checked against the reference itself.
+    """
+    engines = ENGINES if engines is None else engines
+    rows = []
+    ref = reference_engine(utt, strict=strict)
+
+    def record(engine, diffs):
+        for field, exp, act in diffs:
+            rows.append({'call_id': call_id, 'engine': engine, 'field': field,
+                         'expected': exp, 'actual': act})
+
+    if golden:
+        record('reference vs golden', compare(golden, ref, pct_tol, time_tol))
+    for name, engine in engines.items():
+        try:
+            actual = engine(utt, strict)
+        except Exception as e:
+            rows.append({'call_id': call_id, 'engine': name, 'field': 'error',
+                         'expected': '', 'actual': str(e)})
+            continue
+        record(name, compare(ref, actual, pct_tol, time_tol))
+    return rows
@@ -0,0 +1,332 @@
+# Whole-corpus vectorized analysis over one columnar utterance table (pandas/numpy)
+# src/frame_engine.py
+import re
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .analysis import build_result
+from .metrics import overtalk_percentage
+from .profanity import get_profanity_patterns
+from .pii_compliance import DEFAULT_RULES, DISCLOSE_KEYWORDS, VERIFY_KEYWORDS, get_pii_patterns
+from .text_norm import LEET_MAP
+
+AGENT, BORROWER, OTHER = 0, 1, 2
+SPEAKER_CODES = {'agent': AGENT, 'borrower': BORROWER}
+
+_LEET = str.maketrans(LEET_MAP)
+_SEPARATORS = r'[\u2000-\u206F\u2E00-\u2E7F\W_]+'  # as in text_norm.normalize
+_BACKREF = re.compile(r'\\[1-9]|\(\?P=')  # numbered/named backreferences shift when patterns are joined
+
+Call = Tuple[str, List[Dict[str, Any]]]
+
+# builtin sum() of floats is compensated from Python 3.12 on; metrics.py relies on it
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+def build_frame(calls: Sequence[Call]):
+    """
+    One row per utterance of every call: call (index into `calls`), pos
+    (utterance index within the call), speaker (lowercased), code (AGENT,
+    BORROWER or OTHER), stime, etime, text (as a string) and tid, the
+    text's id in `texts`, the distinct texts of the batch.
+    Returns (frame, texts).
+    """
+    import numpy as np
+    import pandas as pd
+
+    call, pos, speaker, stime, etime, text = [], [], [], [], [], []
+    for c, (_, utt) in enumerate(calls):
+        for i, u in enumerate(utt):
+            t = u.get('text', '')
+            call.append(c)
+            pos.append(i)
+            speaker.append(str(u.get('speaker', '')).lower())
+            stime.append(float(u['stime']))
+            etime.append(float(u['etime']))
+            text.append('' if t is None else str(t))
+    df = pd.DataFrame({
+        'call': np.asarray(call, dtype=np.int64),
+        'pos': np.asarray(pos, dtype=np.int64),
+        'speaker': pd.Series(speaker, dtype=object),
+        'stime': np.asarray(stime, dtype=np.float64),
+        'etime': np.asarray(etime, dtype=np.float64),
+        'text': pd.Series(text, dtype=object),
+    })
+    df['code'] = df['speaker'].map(SPEAKER_CODES).fillna(OTHER).astype(np.int8)
+    # scripted lines repeat across calls: normalize and match each distinct text once
+    tid, texts = pd.factorize(df['text'])
+    df['tid'] = tid
+    return df, pd.Series(texts, dtype=object)
+
+
+def normalize_column(texts):
+    """text_norm.normalize over a string Series."""
+    t = texts.str.lower().str.translate(_LEET)
+    t = t.str.replace(_SEPARATORS, ' ', regex=True)
+    return t.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _any_pattern(patterns) -> Optional[re.Pattern]:
+    """One alternation of `patterns`, or None where joining them could change what they match."""
+    if len(patterns) < 2 or len({p.flags for p in patterns}) > 1 or any(_BACKREF.search(p.pattern) for p in patterns):
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{p.pattern})' for p in patterns), patterns[0].flags)
+    except re.error:  # e.g. a group name used by two patterns
+        return None
+
+
+def match_matrix(norm, patterns):
+    """Boolean (len(norm), len(patterns)) matrix: pattern k matches normalized text i."""
+    import numpy as np
+
+    texts = norm.tolist()
+    out = np.zeros((len(texts), len(patterns)), dtype=bool)
+    if not texts or not patterns:
+        return out
+    # most lines match none of the patterns: one search of the alternation rules them out
+    anyp = _any_pattern(patterns)
+    rows = range(len(texts)) if anyp is None else [i for i, t in enumerate(texts) if anyp.search(t)]
+    for i in rows:
+        t = texts[i]
+        out[i] = [p.search(t) is not None for p in patterns]
+    return out
+
+
+def _first(call, stime, pos, mask, n: int) -> List[int]:
+    """Per call, the row of its first utterance in start-time order where mask holds (-1 if none)."""
+    import numpy as np
+
+    first = np.full(n, -1, dtype=np.int64)
+    rows = np.flatnonzero(mask)
+    rows = rows[np.lexsort((pos[rows], stime[rows], call[rows]))]
+    c = call[rows]
+    head = np.ones(len(rows), dtype=bool)
+    head[1:] = c[1:] != c[:-1]
+    first[c[head]] = rows[head]
+    return first.tolist()
+
+
+def _seq_sum(call, values, n: int):
+    """
+    Per-call sum of `values` (rows grouped by call, in summation order),
+    rounded exactly like builtin sum() over the same sequence: left to right,
+    with Neumaier compensation on Python 3.12+. Vectorized across calls, one
+    step per position within a call.
+    """
+    import numpy as np
+
+    total = np.zeros(n)
+    if not len(call):
+        return total
+    comp = np.zeros(n)
+    starts = np.r_[0, np.flatnonzero(np.diff(call)) + 1]
+    rank = np.arange(len(call)) - np.repeat(starts, np.diff(np.r_[starts, len(call)]))
+    by_rank = np.argsort(rank, kind='stable')
+    bounds = np.searchsorted(rank[by_rank], np.arange(rank.max() + 2))
+    for k in range(rank.max() + 1):
+        idx = by_rank[bounds[k]:bounds[k + 1]]
+        c, x = call[idx], values[idx]
+        acc = total[c]
+        t = acc + x
+        if _COMPENSATED_SUM:
+            comp[c] += np.where(np.abs(acc) >= np.abs(x), (acc - t) + x, (x - t) + acc)
+        total[c] = t
+    if _COMPENSATED_SUM:
+        fix = (comp != 0) & np.isfinite(comp)
+        total[fix] += comp[fix]
+    return total
+
+
+def _merge(call, s, e):
+    """
+    metrics.merge_intervals for every call at once: (call, start, end) of
+    the merged segments, in order. Empty intervals (e <= s) are dropped.
+    """
+    import numpy as np
+    import pandas as pd
+
+    keep = e > s
+    call, s, e = call[keep], s[keep], e[keep]
+    order = np.lexsort((e, s, call))
+    call, s, e = call[order], s[order], e[order]
+    if not len(call):
+        return call, s, e
+    # an interval opens a new segment unless it starts before the segment so far has ended
+    reach = pd.Series(e).groupby(call).cummax().to_numpy()
+    new = np.ones(len(call), dtype=bool)
+    new[1:] = (call[1:] != call[:-1]) | (s[1:] > reach[:-1])
+    heads = np.flatnonzero(new)
+    return call[heads], s[heads], np.maximum.reduceat(e, heads)
+
+
+def _intersect(a, b):
+    """(call, start, end) of the overlaps between two merged segment lists, in order."""
+    import numpy as np
+
+    call = np.concatenate([a[0], a[0], b[0], b[0]])
+    t = np.concatenate([a[1], a[2], b[1], b[2]])
+    d = np.concatenate([np.ones(len(a[0])), -np.ones(len(a[0])), np.ones(len(b[0])), -np.ones(len(b[0]))])
+    order = np.lexsort((d, t, call))  # at equal times, ends before starts
+    call, t, d = call[order], t[order], d[order]
+    # segments within each list are disjoint, so depth 2 means both speakers; every call's events sum to 0
+    both = np.flatnonzero(np.cumsum(d)[:-1] == 2) if len(d) else np.zeros(0, dtype=np.int64)
+    start, end = t[both], t[both + 1]
+    keep = end > start
+    return call[both][keep], start[keep], end[keep]
+
+
+def _near_touching(call, t, n: int):
+    """
+    Calls (boolean mask over range(n)) where two distinct endpoints of
+    agent/borrower intervals are within math.isclose tolerance of each other.
+    metrics.overtalk_percentage drops each pairwise overlap that is
+    isclose-empty before merging. Any such overlap spans a run of endpoints
+    with a positive gap at most that small, so these are the only calls where
+    the merged intersection can differ from it.
+    """
+    import numpy as np
+
+    flagged = np.zeros(n, dtype=bool)
+    if len(t) < 2:
+        return flagged
+    order = np.lexsort((t, call))
+    c, t = call[order], t[order]
+    scale = np.zeros(n)
+    np.maximum.at(scale, c, np.abs(t))
+    gap = t[1:] - t[:-1]
+    near = (c[1:] == c[:-1]) & (gap > 0) & (gap <= 1e-9 * scale[c[1:]])
+    flagged[c[1:][near]] = True
+    return flagged
+
+
+def _analyze(calls: Sequence[Call], strict=False) -> Iterator[Tuple[Dict, Dict, float, float, Dict]]:
+    """Yield (prof, comp, overtalk, silence, talk_share) per call, as the per-call detectors do."""
+    import numpy as np
+
+    prof_patterns = get_profanity_patterns()
+    get_pii_patterns()  # same console output as detect_compliance_violation
+    n = len(calls)
+    df, texts = build_frame(calls)
+    norm = normalize_column(texts)
+    code = df['code'].to_numpy()
+    tid = df['tid'].to_numpy()
+    call = df['call'].to_numpy()
+    pos = df['pos'].to_numpy()
+    st = df['stime'].to_numpy()
+    et = df['etime'].to_numpy()
+
+    # keyword matching: once per distinct text, then broadcast to the rows
+    prof_m = match_matrix(norm, prof_patterns)
+    prof_rows = prof_m.any(axis=1)[tid]
+    disclose = match_matrix(norm, DISCLOSE_KEYWORDS).any(axis=1)[tid]
+    verify = match_matrix(norm, VERIFY_KEYWORDS).any(axis=1)[tid]
+    first_disclose = _first(call, st, pos, disclose & (code == AGENT), n)
+    first_verify_agent = _first(call, st, pos, verify & (code == AGENT), n)
+    first_verify_borrower = _first(call, st, pos, verify & (code == BORROWER), n)
+
+    # interval metrics: grouped/segmented reductions over the whole table,
+    # with the same float operations (and summation order) as src/metrics.py
+    s0 = df.groupby('call')['stime'].min().reindex(range(n), fill_value=0.0).to_numpy()
+    e1 = df.groupby('call')['etime'].max().reindex(range(n), fill_value=0.0).to_numpy()
+    call_len = np.maximum(1e-9, e1 - s0)
+    segs = _merge(call, st, et)
+    speaking = _seq_sum(segs[0], segs[2] - segs[1], n)
+    agent, borrower = code == AGENT, code == BORROWER
+    over = _intersect(_merge(call[agent], st[agent], et[agent]), _merge(call[borrower], st[borrower], et[borrower]))
+    overtalk = _seq_sum(over[0], over[2] - over[1], n) / call_len * 100.0
+    both = agent | borrower
+    ends_call = np.concatenate([call[both], call[both]])
+    for c in np.flatnonzero(_near_touching(ends_call, np.concatenate([st[both], et[both]]), n)):
+        overtalk[c] = overtalk_percentage(calls[c][1])  # isclose-empty overlaps: the reference way
+    silence = np.maximum(0.0, call_len - speaking) / call_len * 100.0
+    talk = np.maximum(0.0, et - st)
+    agent_time = _seq_sum(call[agent], talk[agent], n)
+    borrower_time = _seq_sum(call[borrower], talk[borrower], n)
+
+    # per-call work below reads plain lists: element access on a DataFrame costs microseconds a time
+    call_l, pos_l, st_l, tid_l = call.tolist(), pos.tolist(), st.tolist(), tid.tolist()
+    speaker_l = df['speaker'].tolist()
+    matched: Dict[int, List[str]] = {}  # tid -> profanity patterns it matches
+    hits_by_call: Dict[int, List[Dict[str, Any]]] = {}
+    for row in np.flatnonzero(prof_rows).tolist():
+        c, t = call_l[row], tid_l[row]
+        u = calls[c][1][pos_l[row]]
+        if t not in matched:
+            matched[t] = [p.pattern for p, hit in zip(prof_patterns, prof_m[t].tolist()) if hit]
+        hits_by_call.setdefault(c, []).append({
+            'speaker': speaker_l[row],
+            'text': u.get('text', ''),
+            'stime': float(u['stime']),
+            'etime': float(u['etime']),
+            'matches': list(matched[t]),
+        })
+    overtalk, silence = overtalk.tolist(), silence.tolist()
+    e1, agent_time, borrower_time = e1.tolist(), agent_time.tolist(), borrower_time.tolist()
+
+    rule_name = DEFAULT_RULES[0]['name']
+    for c, (_, utt) in enumerate(calls):
+        hits = hits_by_call.get(c, [])
+        prof = {
+            'agent_has': any(h['speaker'] == 'agent' for h in hits),
+            'borrower_has': any(h['speaker'] == 'borrower' for h in hits),
+            'hits': hits,
+        }
+
+        d = first_disclose[c]
+        va = first_verify_agent[c]
+        vb = first_verify_borrower[c]
+        d = None if d < 0 else d
+        va = None if va < 0 else va
+        vb = None if vb < 0 else vb
+        if strict:
+            v = vb if va is not None and vb is not None and st_l[vb] >= st_l[va] else None
+        else:
+            v = va if va is not None else vb
+        disclose_time = st_l[d] if d is not None else None
+        verify_time = st_l[v] if v is not None else None
+        violation = False
+        reason = None
+        if disclose_time is not None and (verify_time is None or disclose_time < verify_time):
+            violation = True
+            if verify_time is None:
+                reason = "Disclosure occurred and no prior verification detected."
+            else:
+                reason = f"Disclosure at {disclose_time:.2f}s before verification at {verify_time:.2f}s."
+        examples = []
+        marks = [(pos_l[r], kind) for r, kind in ((d, 'disclose'), (v, 'verify')) if r is not None]
+        for i, kind in sorted(marks, key=lambda m: m[0]):
+            u = utt[i]
+            examples.append({'type': kind, 'speaker': u['speaker'], 'text': u.get('text', ''), 'stime': float(u['stime'])})
+        evidence = {'disclose_time': disclose_time, 'verify_time': verify_time, 'reason': reason, 'examples': examples}
+        comp = {
+            'violation': violation,
+            'evidence': evidence,
+            'rules': {rule_name: {'type': 'after', 'violation': violation, 'evidence': evidence}},
+        }
+
+        total = e1[c] if utt else 0.0
+        if total > 0:
+            tt = {'total': total, 'agent_pct': agent_time[c] / total * 100,
+                  'borrower_pct': borrower_time[c] / total * 100}
+        else:
+            tt = {'total': 0.0, 'agent_pct': 0.0, 'borrower_pct': 0.0}
+        yield prof, comp, overtalk[c], silence[c], tt
+
+
+def analyze_frame(calls: Sequence[Call], strict=False) -> List[Dict[str, Any]]:
+    """
+    Analyze a batch of calls at once; returns one process_file-shaped result
+    per (call_id, utterances) pair, in order. Covers the default compliance
+    rule (disclosure after verification) only.
+    """
+    return [build_result(call_id, prof, comp, ot, si, tt, len(utt))
+            for (call_id, utt), (prof, comp, ot, si, tt) in zip(calls, _analyze(calls, strict=strict))]
+
+
+def frame_engine(utt, strict=False) -> Dict[str, Any]:
+    """equivalence.Engine over a batch of one call."""
+    from .equivalence import verdict
+
+    prof, comp, ot, si, tt = next(_analyze([('call', utt)], strict=strict))
+    return verdict(prof, comp, ot, si, tt)
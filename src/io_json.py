@@ -1,18 +1,80 @@
 # src/io_json.py
+import codecs
+import gzip
 import json
-import yaml
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+from io import StringIO
 from pathlib import Path
+from .utterance import CompactUtterance
 
 Utterance = Dict[str, Any]
 
-def load_file(path_or_buffer) -> List[Utterance]:
+# wrapper keys that may hold the utterance list, in lookup priority order
+WRAPPER_KEYS = ['utterances', 'utterance', 'transcript', 'data', 'conversation']
+
+# nested objects whose scalar fields also count as call metadata
+METADATA_KEYS = ['metadata', 'meta']
+
+# bulk inputs: newline-delimited JSON, one call per line, optionally gzip-compressed
+BULK_SUFFIXES = ('.ndjson', '.jsonl', '.ndjson.gz', '.jsonl.gz')
+
+def _clean_utterance(u, compact: bool = False, extra_fields: Sequence[str] = ()) -> Optional[Utterance]:
+    """
+    Validate one raw utterance in place; returns None if it must be dropped.
+    With compact=True returns a CompactUtterance keeping only extra_fields.
+    """
+    if not isinstance(u, dict):
+        return None
+    if 'stime' not in u or 'etime' not in u:
+        return None
+    try:
+        st = float(u.get('stime', 0.0))
+        et = float(u.get('etime', st))
+    except Exception:
+        return None
+    if et < st:
+        st, et = et, st
+    u['stime'] = st
+    u['etime'] = et
+    sp = str(u.get('speaker', '')).strip().lower()
+    if 'agent' in sp:
+        u['speaker'] = 'agent'
+    elif sp in ['customer', 'borrower', 'caller']:
+        u['speaker'] = 'borrower'
+    else:
+        u['speaker'] = sp if sp else 'unknown'
+    if compact:
+        return CompactUtterance.from_dict(u, extra_fields)
+    return u
+
+def collect_metadata(doc: Dict[str, Any], meta: Dict[str, Any]):
+    """Copy a transcript document's scalar top-level fields (and those of a metadata object) into meta."""
+    for k, v in doc.items():
+        if k in WRAPPER_KEYS:
+            continue
+        if k in METADATA_KEYS and isinstance(v, dict):
+            collect_metadata(v, meta)
+        elif isinstance(v, (str, int, float, bool)):
+            meta[k] = v
+
+def _sort_if_needed(cleaned: List[Utterance]) -> List[Utterance]:
+    """Sort by stime, skipping the sort when the input is already ordered."""
+    if any(cleaned[i]['stime'] > cleaned[i + 1]['stime'] for i in range(len(cleaned) - 1)):
+        cleaned.sort(key=lambda x: x['stime'])
+    return cleaned
+
+def load_file(path_or_buffer, compact: bool = False, extra_fields: Sequence[str] = (),
+              meta: Optional[Dict[str, Any]] = None) -> List[Utterance]:
     """
     Accepts:
       - Path or path string (reads file)
       - file-like object (has .read())
       - raw JSON/YAML string or bytes
     Returns: list of utterances sorted by stime.
+    compact: return CompactUtterance objects (speaker/text/stime/etime plus
+    any extra_fields) instead of dicts holding every vendor key.
+    meta: if given, filled with the document's call-level fields (see collect_metadata).
     """
     raw = None
 
@@ -38,11 +100,22 @@ def load_file(path_or_buffer) -> List[Utterance]:
     try:
         data = json.loads(raw)
     except Exception:
+        import yaml  # only YAML input pays for this import
         data = yaml.safe_load(raw)
 
+    return clean_utterances(data, compact=compact, extra_fields=extra_fields, meta=meta)
+
+def clean_utterances(data, compact: bool = False, extra_fields: Sequence[str] = (),
+                     meta: Optional[Dict[str, Any]] = None) -> List[Utterance]:
+    """
+    Validate an already-parsed transcript document (list of utterances or a
+    dict with a wrapper key). Returns: list of utterances sorted by stime.
+    """
     if isinstance(data, dict):
-        for k in ['utterances', 'utterance', 'transcript', 'data', 'conversation']:
+        for k in WRAPPER_KEYS:
             if k in data and isinstance(data[k], list):
+                if meta is not None:
+                    collect_metadata(data, meta)
                 data = data[k]
                 break
         else:
@@ -53,27 +126,331 @@ def load_file(path_or_buffer) -> List[Utterance]:
 
     cleaned = []
     for u in data:
-        if not isinstance(u, dict):
-            continue
-        if 'stime' not in u or 'etime' not in u:
-            continue
-        try:
-            st = float(u.get('stime', 0.0))
-            et = float(u.get('etime', st))
-        except Exception:
-            continue
-        if et < st:
-            st, et = et, st
-        u['stime'] = st
-        u['etime'] = et
-        sp = str(u.get('speaker', '')).strip().lower()
-        if 'agent' in sp:
-            u['speaker'] = 'agent'
-        elif sp in ['customer', 'borrower', 'caller']:
-            u['speaker'] = 'borrower'
+        u = _clean_utterance(u, compact, extra_fields)
+        if u is not None:
+            cleaned.append(u)
+
+    return _sort_if_needed(cleaned)
+
+
+_WS = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+class _JsonStream:
+    """Minimal pull reader over a text stream: decodes one JSON value at a time."""
+
+    def __init__(self, read, chunk_size: int):
+        self.read = read
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, want: int = 0) -> bool:
+        """Append the next chunk, dropping everything already consumed."""
+        if self.eof:
+            return False
+        chunk = self.read(max(self.chunk_size, want))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"Malformed JSON: expected {ch!r}")
+        self.pos += 1
+
+    def end(self):
+        """Only whitespace may follow the document (json.loads rejects anything else)."""
+        if self.peek() != '':
+            raise ValueError("Malformed JSON: extra data after the document")
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # value spans past the buffer; grow geometrically so a huge
+                # value is not re-parsed once per chunk
+                if not self.fill(len(self.buf) - self.pos):
+                    raise
+                continue
+            # a number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+    def array(self) -> Iterator[Any]:
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            c = self.peek()
+            self.pos += 1
+            if c == ']':
+                return
+            if c != ',':
+                raise ValueError("Malformed JSON: expected ',' or ']' in array")
+
+    def document(self, meta: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """
+        Yield raw utterances from a top-level array or wrapper object, picking
+        the wrapper list by WRAPPER_KEYS priority like clean_utterances. Only
+        the top-priority key can be streamed as soon as it is seen; a list
+        under a lower-priority key is buffered until the end of the object
+        shows that no better key follows. The rest of the document is always
+        read, so truncated or trailing input fails as it does in load_file.
+        """
+        if self.peek() == '[':
+            yield from self.array()
+            self.end()
+            return
+        self.expect('{')
+        fallback = {}
+        if self.peek() == '}':
+            self.pos += 1
         else:
-            u['speaker'] = sp if sp else 'unknown'
-        cleaned.append(u)
+            while True:
+                key = self.value()
+                self.expect(':')
+                if key == WRAPPER_KEYS[0] and self.peek() == '[':
+                    yield from self.array()
+                    while self.peek() == ',':
+                        self.pos += 1
+                        k = self.value()
+                        self.expect(':')
+                        fallback[k] = self.value()
+                    self.expect('}')
+                    self.end()
+                    if meta is not None:
+                        collect_metadata(fallback, meta)
+                    return
+                fallback[key] = self.value()
+                c = self.peek()
+                self.pos += 1
+                if c == '}':
+                    break
+                if c != ',':
+                    raise ValueError("Malformed JSON: expected ',' or '}' in object")
+        self.end()
+        for k in WRAPPER_KEYS:
+            if isinstance(fallback.get(k), list):
+                if meta is not None:
+                    collect_metadata(fallback, meta)
+                yield from fallback[k]
+                return
+        # no wrapper list: the object itself is a single utterance (as in load_file)
+        yield fallback
+
+def iter_utterances(path_or_buffer, chunk_size: int = 1 << 16, compact: bool = False,
+                    extra_fields: Sequence[str] = (), meta: Optional[Dict[str, Any]] = None) -> Iterator[Utterance]:
+    """
+    Streaming counterpart of load_file: yields validated utterances in file
+    order without materializing the whole document.
+    JSON arrays and objects with a wrapper key (see WRAPPER_KEYS) are parsed
+    incrementally; the wrapper list is chosen by WRAPPER_KEYS priority, as in load_file.
+    Anything else (YAML) falls back to load_file.
+    meta: if given, filled with the call-level fields once the document has been read.
+    """
+    source = path_or_buffer
+    if isinstance(source, (bytes, bytearray)):
+        source = source.decode('utf-8')
 
-    cleaned.sort(key=lambda x: x['stime'])
+    fh = None
+    prefetched = isinstance(source, PrefetchedFile)
+    if prefetched:
+        # the file's bytes, already read: parse them as if streaming from disk
+        read = StringIO(source.data.decode('utf-8')).read
+    elif isinstance(source, str) and source.strip()[:1] in ('{', '['):
+        read = StringIO(source).read
+    elif hasattr(source, "read"):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        # kept for the YAML fallback: the start position, or what was read from an unseekable buffer
+        start = source.tell() if getattr(source, "seekable", lambda: False)() else None
+        seen = [] if start is None else None
+        def read(n):
+            chunk = source.read(n)
+            if seen is not None:
+                seen.append(chunk)
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk, final=not chunk)
+            return chunk
+    else:
+        fh = open(source, 'r', encoding='utf-8')
+        read = fh.read
+
+    yielded = False
+    try:
+        stream = _JsonStream(read, chunk_size)
+        if stream.peek() not in ('{', '['):
+            rest = stream.buf[stream.pos:] + stream.read(-1)
+            yield from load_file(StringIO(rest), compact=compact, extra_fields=extra_fields, meta=meta)
+            return
+        for u in stream.document(meta):
+            u = _clean_utterance(u, compact, extra_fields)
+            if u is not None:
+                yielded = True
+                yield u
+    except (json.JSONDecodeError, ValueError):
+        # YAML flow documents also start with '{' or '['; re-read them the slow way
+        if yielded:
+            raise
+        if fh is not None:
+            fh.close()
+            fh = None
+            retry = source
+        elif prefetched:
+            retry = source.data
+        elif isinstance(source, str):
+            retry = source  # the raw document
+        elif start is not None:
+            source.seek(start)
+            retry = source
+        else:
+            rest = source.read()
+            retry = (seen[0][:0] if seen else rest[:0]).join(seen + [rest])
+        if meta is not None:
+            meta.clear()
+        yield from load_file(retry, compact=compact, extra_fields=extra_fields, meta=meta)
+    finally:
+        if fh is not None:
+            fh.close()
+
+def load_file_streaming(path_or_buffer, chunk_size: int = 1 << 16, compact: bool = False,
+                        extra_fields: Sequence[str] = (), meta: Optional[Dict[str, Any]] = None) -> List[Utterance]:
+    """
+    Same result as load_file for JSON input, with peak memory close to the
+    size of the cleaned utterances rather than several times the file size.
+    Sorts only when the input is not already ordered by stime.
+    """
+    cleaned = []
+    ordered = True
+    last = float('-inf')
+    for u in iter_utterances(path_or_buffer, chunk_size=chunk_size, compact=compact,
+                             extra_fields=extra_fields, meta=meta):
+        if u['stime'] < last:
+            ordered = False
+        last = u['stime']
+        cleaned.append(u)
+    if not ordered:
+        cleaned.sort(key=lambda x: x['stime'])
     return cleaned
+
+
+def is_bulk_file(path) -> bool:
+    return Path(path).name.lower().endswith(BULK_SUFFIXES)
+
+class BulkRecord:
+    """
+    One call read from a bulk (NDJSON) file: its parsed JSON object, or the
+    reason the line could not be used. `stem` is the call id, so a record
+    stands in for a per-call file path wherever only the call id is needed.
+    """
+    __slots__ = ('source', 'line', 'call_id', 'data', 'error')
+
+    def __init__(self, source: str, line: int, call_id: str, data: Any = None, error: Optional[str] = None):
+        self.source = source
+        self.line = line
+        self.call_id = call_id
+        self.data = data
+        self.error = error
+
+    @property
+    def stem(self) -> str:
+        return self.call_id
+
+    @property
+    def name(self) -> str:
+        return f"{Path(self.source).name}:{self.line}"
+
+    def __repr__(self):
+        return f"BulkRecord({self.name!r}, call_id={self.call_id!r})"
+
+class PrefetchedFile:
+    """
+    A transcript file whose bytes were read ahead (src/prefetch.py), or the
+    error reading it raised. It stands in for the path: `stem`, `name` and
+    os.fspath() are the file's, and load_input parses the bytes instead of
+    opening the file again.
+    """
+    __slots__ = ('path', 'data', 'error')
+
+    def __init__(self, path, data: Optional[bytes] = None, error: Optional[BaseException] = None):
+        self.path = Path(path)
+        self.data = data
+        self.error = error
+
+    @property
+    def stem(self) -> str:
+        return self.path.stem
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+    def __repr__(self):
+        return f"PrefetchedFile({str(self.path)!r})"
+
+def open_bulk(path):
+    """Open a bulk file as text, decompressing gzip (detected by its magic bytes)."""
+    with open(path, 'rb') as fh:
+        gzipped = fh.read(2) == b'\x1f\x8b'
+    if gzipped:
+        return gzip.open(path, 'rt', encoding='utf-8-sig')
+    return open(path, 'r', encoding='utf-8-sig')
+
+def iter_records(path) -> Iterator[BulkRecord]:
+    """
+    Stream the calls of an NDJSON file (optionally gzip-compressed), one
+    line at a time. Each line is a JSON object with a `call_id` and the
+    utterance list under one of WRAPPER_KEYS; a line without call_id gets
+    <file stem>_<line number>. A line that is not a JSON object yields a
+    record carrying the error, so one bad record never stops the file.
+    """
+    stem = Path(path).name.split('.')[0]
+    with open_bulk(path) as fh:
+        for n, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            call_id = f"{stem}_{n}"
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield BulkRecord(str(path), n, call_id, error=f"line {n}: invalid JSON: {e}")
+                continue
+            if not isinstance(data, dict):
+                yield BulkRecord(str(path), n, call_id, error=f"line {n}: expected a JSON object per call")
+                continue
+            if data.get('call_id') not in (None, ''):
+                call_id = str(data['call_id'])
+            yield BulkRecord(str(path), n, call_id, data=data)
+
+def load_input(item, compact: bool = False, extra_fields: Sequence[str] = (),
+               meta: Optional[Dict[str, Any]] = None) -> List[Utterance]:
+    """Utterances of one call: a transcript file (streamed), a PrefetchedFile or a BulkRecord."""
+    if isinstance(item, PrefetchedFile) and item.error is not None:
+        raise item.error
+    if isinstance(item, BulkRecord):
+        if item.error:
+            raise ValueError(item.error)
+        return clean_utterances(item.data, compact=compact, extra_fields=extra_fields, meta=meta)
+    return load_file_streaming(item, compact=compact, extra_fields=extra_fields, meta=meta)
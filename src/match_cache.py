@@ -0,0 +1,92 @@
+# Cross-call memoization of utterance-level pattern matching
+# src/match_cache.py
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+from .text_norm import normalize
+
+
+def pattern_set_version(patterns: Sequence[re.Pattern]) -> str:
+    """Identifies a pattern set by content, so edited pattern files never hit stale entries."""
+    h = hashlib.sha1()
+    for p in patterns:
+        h.update(f"{p.flags}:{p.pattern}\n".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+class MatchCache:
+    """
+    Bounded LRU cache of pattern matches keyed by (pattern-set version, raw text).
+
+    Agents read the same scripted lines in thousands of calls; each distinct
+    line is normalized and scanned once per pattern set, and repeats are
+    answered from the cache. A lookup (and, on a miss, the scan and insert)
+    takes the lock once, so unique text costs little more than no cache.
+    maxsize=0 disables caching: texts are scanned directly, without locking.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._matches: "OrderedDict[Tuple[str, str], Tuple[str, ...]]" = OrderedDict()
+        self._versions: Dict[int, Tuple[Sequence[re.Pattern], str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _version(self, patterns: Sequence[re.Pattern]) -> str:
+        # keyed by id() but holding the list, so the id can't be reused meanwhile
+        entry = self._versions.get(id(patterns))
+        if entry is None or entry[0] is not patterns:
+            entry = (patterns, pattern_set_version(patterns))
+            if len(self._versions) >= 64:  # e.g. a custom pattern path reloaded per call
+                self._versions.clear()
+            self._versions[id(patterns)] = entry
+        return entry[1]
+
+    def matches(self, text, patterns: Sequence[re.Pattern]) -> Tuple[str, ...]:
+        """Source strings of the patterns that match the normalized text, in pattern order."""
+        if self.maxsize <= 0 or not isinstance(text, str):
+            norm = normalize(text)
+            return tuple(p.pattern for p in patterns if p.search(norm))
+        store = self._matches
+        with self._lock:
+            key = (self._version(patterns), text)
+            value = store.get(key)
+            if value is not None:
+                store.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            norm = normalize(text)
+            value = store[key] = tuple(p.pattern for p in patterns if p.search(norm))
+            if len(store) > self.maxsize:
+                store.popitem(last=False)
+            return value
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0,
+            'entries': len(self._matches),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._matches.clear()
+            self._versions.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by every call analyzed in this process (batch run, service, app session)
+DEFAULT_CACHE = MatchCache()
+
+
+def configure(maxsize: int):
+    """Resize (or with 0, disable) the shared cache; existing entries are dropped."""
+    DEFAULT_CACHE.clear()
+    DEFAULT_CACHE.maxsize = maxsize
@@ -4,8 +4,8 @@ import re
 import os
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from unittest import result
-from .text_norm import normalize
+from .match_cache import DEFAULT_CACHE, MatchCache
+from .compliance_rules import RuleSet, load_rules
 
 def load_pii_patterns(path="patterns/pii_patterns.txt"):
     pats = []
@@ -37,7 +37,20 @@ def load_pii_patterns(path="patterns/pii_patterns.txt"):
     print(f"Loaded {len(pats)} PII patterns")
     return pats
 
-PII_PATTERNS = load_pii_patterns()
+_PII_PATTERNS = None
+
+def get_pii_patterns():
+    """Default patterns, loaded and compiled on first use rather than at import."""
+    global _PII_PATTERNS
+    if _PII_PATTERNS is None:
+        _PII_PATTERNS = load_pii_patterns()
+    return _PII_PATTERNS
+
+def __getattr__(name):
+    # keep `from src.pii_compliance import PII_PATTERNS` working, lazily
+    if name == "PII_PATTERNS":
+        return get_pii_patterns()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # split PII patterns into categories roughly: verification vs disclosure
 VERIFY_KEYWORDS = [
@@ -55,22 +68,85 @@ DISCLOSE_KEYWORDS = [
     re.compile(r'\b(transaction id|txn id|payment of|payment has been processed)\b', re.IGNORECASE),
 ]
 
-def _first_time(utterances: List[Dict[str, Any]], patterns: List[re.Pattern], who: Optional[str]=None) -> Optional[float]:
+MINI_MIRANDA_KEYWORDS = [
+    re.compile(r'\b(attempt(ing)? to collect a debt|this is a debt collector|debt collector)\b', re.IGNORECASE),
+    re.compile(r'\binformation (obtained|we obtain) will be used\b', re.IGNORECASE),
+]
+
+DNC_KEYWORDS = [
+    re.compile(r'\b(do not call|do-not-call|dnc|don\'t call|stop calling)\b', re.IGNORECASE),
+]
+
+# events rules can refer to; a rules file may add more or override these
+BUILTIN_EVENTS = {
+    'disclose': {'speaker': 'agent', 'label': 'disclosure', 'patterns': DISCLOSE_KEYWORDS},
+    'verify_request': {'speaker': 'agent', 'label': 'verification request', 'patterns': VERIFY_KEYWORDS},
+    'verify_confirm': {'speaker': 'borrower', 'label': 'verification confirmation', 'patterns': VERIFY_KEYWORDS},
+    # lenient: the agent's request, else the borrower's confirmation; strict: a confirmation at/after the request
+    'verify': {'label': 'verification', 'first_of': ['verify_request', 'verify_confirm'],
+               'strict_sequence': ['verify_request', 'verify_confirm']},
+    'mini_miranda': {'speaker': 'agent', 'label': 'mini-Miranda', 'patterns': MINI_MIRANDA_KEYWORDS},
+    'dnc': {'speaker': 'borrower', 'label': 'do-not-call request', 'patterns': DNC_KEYWORDS},
+}
+
+DEFAULT_RULES = [
+    {'name': 'disclosure_after_verification', 'type': 'after', 'event': 'disclose', 'requires': 'verify'},
+]
+
+_RULESETS: Dict[Optional[str], RuleSet] = {}
+
+def get_ruleset(path=None) -> RuleSet:
+    """The compiled default rules, or those from a rules file; compiled once per path."""
+    ruleset = _RULESETS.get(path)
+    if ruleset is None:
+        if path:
+            spec = load_rules(path)
+            events = dict(BUILTIN_EVENTS)
+            events.update(spec.get('events') or {})
+            ruleset = RuleSet(spec.get('rules') or DEFAULT_RULES, events)
+        else:
+            ruleset = RuleSet(DEFAULT_RULES, BUILTIN_EVENTS)
+        _RULESETS[path] = ruleset
+    return ruleset
+
+def _first_time(utterances: List[Dict[str, Any]], patterns: List[re.Pattern], who: Optional[str]=None,
+                cache: Optional[MatchCache] = None) -> Optional[float]:
     tmin = None
+    cache = DEFAULT_CACHE if cache is None else cache
     for u in utterances:
         if who and u.get('speaker','').lower() != who:
             continue
-        txt = normalize(u.get('text',''))
-        for p in patterns:
-            if p.search(txt):
-                st = float(u['stime'])
-                if tmin is None or st < tmin:
-                    tmin = st
-                break
+        if cache.matches(u.get('text',''), patterns):
+            st = float(u['stime'])
+            if tmin is None or st < tmin:
+                tmin = st
     return tmin
 
-def detect_compliance_violation(utterances: List[Dict[str, Any]], strict=False, path=None) -> Dict[str, Any]:
+def detect_compliance_violation(utterances: List[Dict[str, Any]], strict=False, path=None,
+                                cache: Optional[MatchCache] = None, rules=None) -> Dict[str, Any]:
+    """
+    Evaluate the compliance rules in one pass over the call.
+    Returns:
+      - violation: bool, any rule violated
+      - evidence: the primary rule's evidence (by default disclosure after
+        verification: disclose_time, verify_time, reason, examples)
+      - rules: {rule name: {type, violation, evidence}}
+    strict: if True, require borrower confirmation after agent's request to count verification
+    path: optional custom pattern file path
+    cache: match cache shared across calls (default: the process-wide one)
+    rules: optional rules file (JSON/YAML, see src/compliance_rules.py); default: DEFAULT_RULES
+    """
+    if path:
+        load_pii_patterns(path)
+    else:
+        get_pii_patterns()
+    return get_ruleset(rules).evaluate(utterances, strict=strict, cache=cache)
+
+def detect_compliance_violation_reference(utterances: List[Dict[str, Any]], strict=False, path=None,
+                                          cache: Optional[MatchCache] = None) -> Dict[str, Any]:
     """
+    The original multi-scan check of the default rule, kept as the reference
+    for `run_batch.py --verify`.
     Returns:
       - violation: bool
       - evidence: dict with times and example utterances
@@ -80,15 +156,16 @@ def detect_compliance_violation(utterances: List[Dict[str, Any]], strict=False,
       - violation if disclosure occurs before verification or if disclosure exists and no verification found
     strict: if True, require borrower confirmation after agent's request to count verification
     path: optional custom pattern file path
+    cache: match cache shared across calls (default: the process-wide one)
     """
     # Use custom patterns if path provided
-    patterns = load_pii_patterns(path) if path else PII_PATTERNS
+    patterns = load_pii_patterns(path) if path else get_pii_patterns()
 
-    disclose_time = _first_time(utterances, DISCLOSE_KEYWORDS, who='agent')
+    disclose_time = _first_time(utterances, DISCLOSE_KEYWORDS, who='agent', cache=cache)
     # agent verification requests
-    verify_agent_time = _first_time(utterances, VERIFY_KEYWORDS, who='agent')
+    verify_agent_time = _first_time(utterances, VERIFY_KEYWORDS, who='agent', cache=cache)
     # borrower confirmations could also be in verify patterns (like dates, numbers); treat borrower as confirm
-    verify_borrower_time = _first_time(utterances, VERIFY_KEYWORDS, who='borrower')
+    verify_borrower_time = _first_time(utterances, VERIFY_KEYWORDS, who='borrower', cache=cache)
 
     verify_time = None
     if strict:
@@ -0,0 +1,101 @@
+# Read-ahead of transcript bytes on a thread pool, overlapping storage latency with analysis
+# src/prefetch.py
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from .io_json import PrefetchedFile
+from .telemetry import Registry
+
+_END = object()
+
+
+class Prefetcher:
+    """
+    Wraps the stream of inputs (paths and bulk records) handed to the
+    analysis loop. Up to `depth` items ahead of the one being analyzed are
+    read by `threads` reader threads; each path comes out as a
+    PrefetchedFile holding its bytes, in the original order. The window is
+    the backpressure: nothing more is read until the consumer takes the next
+    item, so at most `depth` files are held in memory. Files larger than
+    `max_bytes` are passed through as paths and streamed by the loader as
+    usual. Bulk records are already in memory and pass straight through.
+
+    Time the consumer spends blocked on a read that is not done yet is
+    io_wait; the rest of the run, between items, is compute.
+    """
+
+    def __init__(self, depth: int = 64, threads: int = 8, max_bytes: int = 64 << 20,
+                 registry: Optional[Registry] = None):
+        self.depth = max(1, depth)
+        self.threads = max(1, threads)
+        self.max_bytes = max_bytes
+        r = registry or Registry()
+        self.io_wait = r.counter("callanalyzer_io_wait_seconds_total", "Time the analysis loop waited for prefetched reads")
+        self.read_seconds = r.counter("callanalyzer_io_read_seconds_total", "Time reader threads spent opening and reading files")
+        self.bytes_read = r.counter("callanalyzer_io_bytes_total", "Bytes read ahead by the prefetcher")
+        self.files_read = r.counter("callanalyzer_io_files_total", "Files read ahead by the prefetcher")
+        self.queued = r.gauge("callanalyzer_io_queue_depth", "Items read ahead and not yet analyzed")
+        self.streamed = r.counter("callanalyzer_io_streamed_files_total", "Files over the prefetch size limit, left to the loader")
+        self.elapsed = 0.0
+
+    def _read(self, path: Path):
+        started = time.monotonic()
+        try:
+            with open(path, 'rb') as fh:
+                if os.fstat(fh.fileno()).st_size > self.max_bytes:
+                    self.streamed.inc()
+                    return path  # too big to hold: the loader streams it
+                data = fh.read()
+        except OSError as e:
+            return PrefetchedFile(path, error=e)
+        finally:
+            self.read_seconds.inc(time.monotonic() - started)
+        self.bytes_read.inc(len(data))
+        self.files_read.inc()
+        return PrefetchedFile(path, data)
+
+    def __call__(self, items: Iterable[Any]) -> Iterator[Any]:
+        started = time.monotonic()
+        pool = ThreadPoolExecutor(self.threads, thread_name_prefix="prefetch")
+        window = deque()
+        items = iter(items)
+        try:
+            while True:
+                while len(window) < self.depth:
+                    item = next(items, _END)
+                    if item is _END:
+                        break
+                    window.append(pool.submit(self._read, item) if isinstance(item, Path) else item)
+                self.queued.set(len(window))
+                if not window:
+                    return
+                head = window.popleft()
+                if isinstance(head, Future):
+                    if not head.done():
+                        waited = time.monotonic()
+                        head.result()
+                        self.io_wait.inc(time.monotonic() - waited)
+                    head = head.result()
+                yield head
+        finally:
+            for fut in window:
+                if isinstance(fut, Future):
+                    fut.cancel()
+            pool.shutdown(wait=False)
+            self.queued.set(0)
+            self.elapsed += time.monotonic() - started
+
+    def stats(self) -> Dict[str, Any]:
+        wait = self.io_wait.value()
+        return {
+            'files': int(self.files_read.value()),
+            'bytes': int(self.bytes_read.value()),
+            'streamed': int(self.streamed.value()),
+            'io_wait_seconds': wait,
+            'compute_seconds': max(0.0, self.elapsed - wait),
+            'read_seconds': self.read_seconds.value(),
+        }
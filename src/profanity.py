@@ -4,7 +4,7 @@ import re
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import os
-from .text_norm import normalize
+from .match_cache import DEFAULT_CACHE, MatchCache
 
 def load_profanity_patterns(path: str = "patterns/profanity_patterns.txt"):
     patterns = []
@@ -38,26 +38,38 @@ def load_profanity_patterns(path: str = "patterns/profanity_patterns.txt"):
     print(f"Loaded {len(patterns)} profanity patterns")
     return patterns
 
-PROFANITY_PATTERNS = load_profanity_patterns()
+_PROFANITY_PATTERNS = None
 
-def detect_profanity(utterances: List[Dict[str, Any]], path: Optional[str] = None) -> Dict[str, Any]:
+def get_profanity_patterns():
+    """Default patterns, loaded and compiled on first use rather than at import."""
+    global _PROFANITY_PATTERNS
+    if _PROFANITY_PATTERNS is None:
+        _PROFANITY_PATTERNS = load_profanity_patterns()
+    return _PROFANITY_PATTERNS
+
+def __getattr__(name):
+    # keep `from src.profanity import PROFANITY_PATTERNS` working, lazily
+    if name == "PROFANITY_PATTERNS":
+        return get_profanity_patterns()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def detect_profanity(utterances: List[Dict[str, Any]], path: Optional[str] = None,
+                     cache: Optional[MatchCache] = None) -> Dict[str, Any]:
     """
     Returns summary dict:
       - agent_has, borrower_has (bool)
       - hits: list of entries with speaker, text, stime, etime, matched_patterns (list)
+    cache: match cache shared across calls (default: the process-wide one)
     """
     # Reload patterns if custom path provided
-    patterns = load_profanity_patterns(path) if path else PROFANITY_PATTERNS
+    patterns = load_profanity_patterns(path) if path else get_profanity_patterns()
 
     agent_has = False
     borrower_has = False
     hits = []
+    cache = DEFAULT_CACHE if cache is None else cache
     for u in utterances:
-        text = normalize(u.get('text', ''))
-        matched = []
-        for pat in patterns:
-            if pat.search(text):
-                matched.append(pat.pattern)
+        matched = list(cache.matches(u.get('text', ''), patterns))
         if matched:
             s = u.get('speaker','').lower()
             if s == 'agent':
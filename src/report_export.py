@@ -0,0 +1,193 @@
+# Static HTML report (timeline + talk-share charts) for flagged calls
+# src/report_export.py
+import html
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BUNDLE = "plotly.min.js"  # written once at the report root; every page links to it
+PAGES_DIR = "calls"
+
+SUMMARY_KEYS = ("call_id", "agent_prof", "borrower_prof", "compliance_violation", "overtalk_pct",
+                "silence_pct", "total_time", "agent_share", "borrower_share")
+
+_STYLE = """
+body { background: #0e1117; color: #fafafa; font-family: -apple-system, Segoe UI, Helvetica, Arial, sans-serif; margin: 2em; }
+a { color: #00FFFF; }
+table { border-collapse: collapse; margin: 1em 0; }
+th, td { border: 1px solid #333; padding: 4px 10px; text-align: left; vertical-align: top; }
+th { background: #1c1f26; }
+pre { background: #1c1f26; padding: 1em; overflow-x: auto; }
+.charts { display: flex; flex-wrap: wrap; gap: 1em; }
+.timeline { flex: 2 1 600px; } .pie { flex: 1 1 300px; }
+.flag { color: #FF1744; font-weight: bold; }
+"""
+
+_LEGEND = """
+<p><b>Color Legend:</b>
+<span style="color:#00FFFF;">&#9632;</span> Agent
+<span style="color:#A569BD;">&#9632;</span> Borrower
+<span style="color:#FF8C00;">&#9632;</span> Overtalk (on interrupter)
+<span style="color:#B2B6BA;">&#9632;</span> Silence (between turns)</p>
+"""
+
+
+def is_flagged(res: Dict[str, Any]) -> bool:
+    """A call is exported if it has profanity (either speaker) or a compliance violation."""
+    return "Yes" in (res.get("agent_prof"), res.get("borrower_prof"), res.get("compliance_violation"))
+
+
+def flags(res: Dict[str, Any]) -> List[str]:
+    names = (("agent_prof", "agent profanity"), ("borrower_prof", "borrower profanity"),
+             ("compliance_violation", "compliance violation"))
+    return [label for key, label in names if res.get(key) == "Yes"]
+
+
+def _page(title: str, body: str, script_src: Optional[str] = None) -> str:
+    script = f'<script src="{script_src}" charset="utf-8"></script>\n' if script_src else ""
+    return (f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>\n"
+            f"<style>{_STYLE}</style>\n{script}</head><body>\n{body}\n</body></html>\n")
+
+
+def _table(headers: List[str], rows: List[List[str]]) -> str:
+    head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+    body = "".join("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>\n" for row in rows)
+    return f"<table><tr>{head}</tr>\n{body}</table>"
+
+
+def render_call(job: Tuple[Any, Dict[str, Any], str]) -> Optional[str]:
+    """
+    Worker: reload one call's utterances, build its charts and write its page.
+    job = (file path or BulkRecord, slim result, page path). Returns an error
+    message, or None on success.
+    """
+    from .io_json import load_input
+    from .viz import talk_share_pie, timeline_figure
+
+    item, res, page_path = job
+    try:
+        utt = load_input(item, compact=True)
+        config = {"displaylogo": False, "responsive": True}
+        timeline = timeline_figure(utt)
+        if timeline is None:
+            charts = "<p>No valid utterance timestamps found for timeline visualization.</p>"
+        else:
+            charts = ('<div class="charts"><div class="timeline">'
+                      + timeline.to_html(full_html=False, include_plotlyjs=False, div_id="timeline", config=config)
+                      + '</div><div class="pie">'
+                      + talk_share_pie(utt).to_html(full_html=False, include_plotlyjs=False, div_id="pie", config=config)
+                      + "</div></div>" + _LEGEND)
+
+        call_id = str(res["call_id"])
+        hits = res.get("hits", [])
+        prof = _table(["Speaker", "Time", "Text", "Matches"],
+                      [[html.escape(str(h.get("speaker", ""))), f"{float(h.get('stime', 0)):.1f}s",
+                        html.escape(str(h.get("text", ""))), html.escape(", ".join(h.get("matches", [])))]
+                       for h in hits]) if hits else "<p>No profane utterances detected.</p>"
+        metrics = _table(["Overtalk %", "Silence %", "Total Time", "Agent Talk %", "Borrower Talk %"],
+                         [[html.escape(str(res.get(k, ""))) for k in
+                           ("overtalk_pct", "silence_pct", "total_time", "agent_share", "borrower_share")]])
+        body = (f'<p><a href="../index.html">&larr; All flagged calls</a></p>\n'
+                f"<h1>{html.escape(call_id)}</h1>\n"
+                f'<p class="flag">{html.escape(", ".join(flags(res)))}</p>\n{metrics}\n'
+                f"<h2>Timeline Visualization</h2>\n{charts}\n"
+                f"<h2>Profanity Detection</h2>\n{prof}\n"
+                f"<h2>Compliance Evidence</h2>\n<pre>{html.escape(json.dumps(res.get('evidence', {}), indent=2))}</pre>")
+        tmp = page_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(_page(f"Call {call_id}", body, f"../{BUNDLE}"))
+        os.replace(tmp, page_path)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def _warm():
+    """Worker initializer: pay the plotly/pandas imports once per process, not per call."""
+    from . import viz  # noqa: F401
+
+
+class ReportExporter:
+    """
+    Renders a page per flagged call into <out_dir>/calls/ on a process pool
+    while the analysis goes on, then writes <out_dir>/index.html. All pages
+    load the one plotly.min.js at the report root instead of embedding the
+    ~4.5 MB bundle each. At most workers * 4 pages are in flight (results
+    are held until their page is submitted, so memory stays bounded).
+    """
+
+    def __init__(self, out_dir, workers: Optional[int] = None):
+        from concurrent.futures import ProcessPoolExecutor
+        from plotly.offline import get_plotlyjs
+
+        self.out_dir = Path(out_dir)
+        pages = self.out_dir / PAGES_DIR
+        pages.mkdir(parents=True, exist_ok=True)
+        for old in pages.glob("*.html"):  # pages of an earlier export would be orphaned by the new index
+            old.unlink()
+        bundle = self.out_dir / BUNDLE
+        js = get_plotlyjs()
+        if not bundle.exists() or bundle.stat().st_size != len(js.encode("utf-8")):
+            bundle.write_text(js, encoding="utf-8")
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_warm)
+        self.window = self.workers * 4
+        self.inflight = {}
+        self.rows: List[Dict[str, Any]] = []
+        self.names = set()
+        self.failed: Dict[str, Tuple[str, str]] = {}  # page -> (call_id, error)
+
+    def _page_name(self, call_id: str) -> str:
+        base = re.sub(r"[^\w.-]", "_", call_id) or "call"
+        name, n = base, 1
+        while name.lower() in self.names:  # same call ID in two folders, or case-insensitive filesystems
+            n += 1
+            name = f"{base}-{n}"
+        self.names.add(name.lower())
+        return f"{name}.html"
+
+    def add(self, item, res: Dict[str, Any]):
+        """Queue a page for `res` if the call is flagged (blocks while the window is full)."""
+        if not is_flagged(res):
+            return
+        while len(self.inflight) >= self.window:
+            self._drain()
+        slim = {k: res.get(k) for k in SUMMARY_KEYS}
+        slim["hits"] = res.get("prof_details", {}).get("hits", [])
+        slim["evidence"] = res.get("comp_details", {}).get("evidence", {})
+        page = self._page_name(str(res["call_id"]))
+        self.rows.append(dict({k: slim[k] for k in SUMMARY_KEYS}, page=page))
+        fut = self.pool.submit(render_call, (item, slim, str(self.out_dir / PAGES_DIR / page)))
+        self.inflight[fut] = (slim["call_id"], page)
+
+    def _drain(self):
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        done, _ = wait(list(self.inflight), return_when=FIRST_COMPLETED)
+        for fut in done:
+            call_id, page = self.inflight.pop(fut)
+            try:
+                error = fut.result()
+            except Exception as e:  # a worker died
+                error = str(e)
+            if error:
+                self.failed[page] = (call_id, error)
+
+    def close(self) -> Path:
+        """Wait for the pages, write index.html and return its path."""
+        while self.inflight:
+            self._drain()
+        self.pool.shutdown()
+        rows = []
+        for r in sorted(self.rows, key=lambda r: (str(r["call_id"]), r["page"])):
+            link = (html.escape(str(r["call_id"])) if r["page"] in self.failed else
+                    f'<a href="{PAGES_DIR}/{html.escape(r["page"])}">{html.escape(str(r["call_id"]))}</a>')
+            rows.append([link, html.escape(", ".join(flags(r)))]
+                        + [html.escape(str(r.get(k, ""))) for k in ("overtalk_pct", "silence_pct", "total_time")])
+        body = (f"<h1>Flagged calls ({len(self.rows)})</h1>\n"
+                + _table(["Call ID", "Flags", "Overtalk %", "Silence %", "Total Time"], rows))
+        index = self.out_dir / "index.html"
+        index.write_text(_page("Flagged calls", body), encoding="utf-8")
+        return index
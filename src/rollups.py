@@ -0,0 +1,186 @@
+# Mergeable per-agent/team/day aggregates maintained as calls finish
+# src/rollups.py
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DIMENSIONS = ('agent', 'team', 'day')
+# metadata fields each dimension is read from, first present wins
+METADATA_FIELDS = {
+    'agent': ('agent', 'agent_id', 'agent_name'),
+    'team': ('team', 'team_id', 'team_name', 'queue'),
+    'day': ('date', 'call_date', 'day', 'start_time', 'started_at', 'timestamp'),
+}
+UNKNOWN = 'unknown'
+
+# running sums per key; every field merges by addition
+FIELDS = ('calls', 'profanity', 'agent_profanity', 'borrower_profanity', 'violations',
+          'overtalk_sum', 'silence_sum')
+
+Key = Tuple[str, str, str]
+
+
+def _day(value) -> Optional[str]:
+    """YYYY-MM-DD from an ISO date/datetime string or a Unix timestamp (s or ms)."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        ts = value / 1000.0 if value > 1e11 else value
+        try:
+            return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+        except (OverflowError, OSError, ValueError):
+            return None
+    m = re.match(r'\s*(\d{4})[-/]?(\d{2})[-/]?(\d{2})', str(value))
+    return f"{m.group(1)}-{m.group(2)}-{m.group(3)}" if m else None
+
+
+def call_dimensions(metadata: Dict[str, Any], rel_path: str = "",
+                    path_regex: Optional[re.Pattern] = None) -> Key:
+    """
+    (agent, team, day) for one call: from its transcript metadata, then for
+    anything missing, from the named groups of path_regex searched in the
+    input-relative path (e.g. r'(?P<team>[^/]+)/(?P<agent>[^/]+)/(?P<day>\\d{8})').
+    """
+    dims = {}
+    for dim, fields in METADATA_FIELDS.items():
+        for f in fields:
+            if metadata.get(f) not in (None, ''):
+                dims[dim] = _day(metadata[f]) if dim == 'day' else str(metadata[f])
+                break
+    if path_regex is not None:
+        m = path_regex.search(rel_path)
+        if m:
+            for dim, value in m.groupdict().items():
+                if dim in DIMENSIONS and value and not dims.get(dim):
+                    dims[dim] = _day(value) if dim == 'day' else value
+    return tuple(dims.get(d) or UNKNOWN for d in DIMENSIONS)
+
+
+def empty() -> Dict[str, float]:
+    return {f: 0 for f in FIELDS}
+
+
+def add_call(agg: Dict[str, float], res: Dict[str, Any]):
+    """Fold one process_file result into an aggregate (numbers from raw_metrics, not the % strings)."""
+    agent = bool(res.get('prof_details', {}).get('agent_has'))
+    borrower = bool(res.get('prof_details', {}).get('borrower_has'))
+    agg['calls'] += 1
+    agg['profanity'] += agent or borrower
+    agg['agent_profanity'] += agent
+    agg['borrower_profanity'] += borrower
+    agg['violations'] += bool(res.get('comp_details', {}).get('violation'))
+    agg['overtalk_sum'] += float(res['raw_metrics']['overtalk'])
+    agg['silence_sum'] += float(res['raw_metrics']['silence'])
+
+
+def merge_into(agg: Dict[str, float], other: Dict[str, float]):
+    for f in FIELDS:
+        agg[f] += other.get(f, 0)
+
+
+class RollupStore:
+    """
+    Partials on disk: <root>/day=YYYY-MM-DD/<source>.json, one file per day
+    and source (an input directory + shard), holding the running sums per
+    (agent, team). A re-run of the same source replaces its partials; every
+    other source's are left alone, so shards and separate drops add up.
+    """
+
+    def __init__(self, root, source: str, resume: bool = False):
+        self.root = Path(root)
+        self.name = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+        self.source = source
+        self.parts: Dict[str, Dict[Tuple[str, str], Dict[str, float]]] = {}
+        self.dirty = set()
+        if resume:
+            for day_dir in self._day_dirs():
+                p = day_dir / f"{self.name}.json"
+                if p.exists():
+                    self.parts[day_dir.name[4:]] = _read_partial(p)
+        else:
+            for day_dir in self._day_dirs():
+                try:
+                    (day_dir / f"{self.name}.json").unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _day_dirs(self) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return sorted(d for d in self.root.iterdir() if d.is_dir() and d.name.startswith('day='))
+
+    def add(self, key: Key, res: Dict[str, Any]):
+        agent, team, day = key
+        part = self.parts.setdefault(day, {})
+        add_call(part.setdefault((agent, team), empty()), res)
+        self.dirty.add(day)
+
+    def add_result(self, res: Dict[str, Any], rel_path: str = "", path_regex: Optional[re.Pattern] = None):
+        """Account one successful process_file result under its dimensions."""
+        self.add(call_dimensions(res.get('metadata', {}), rel_path, path_regex), res)
+
+    def flush(self):
+        """Write the partials changed since the last flush (atomically)."""
+        for day in sorted(self.dirty):
+            d = self.root / f"day={day}"
+            d.mkdir(parents=True, exist_ok=True)
+            rows = [dict(agent=a, team=t, **agg) for (a, t), agg in sorted(self.parts[day].items())]
+            tmp = d / f".{self.name}.json.tmp"
+            tmp.write_text(json.dumps({'source': self.source, 'day': day, 'rows': rows}), encoding='utf-8')
+            os.replace(tmp, d / f"{self.name}.json")
+        self.dirty.clear()
+
+
+def _read_partial(path: Path) -> Dict[Tuple[str, str], Dict[str, float]]:
+    data = json.loads(path.read_text(encoding='utf-8'))
+    return {(r['agent'], r['team']): {f: r.get(f, 0) for f in FIELDS} for r in data.get('rows', [])}
+
+
+def load_partials(root, since: Optional[str] = None, until: Optional[str] = None) -> Dict[Key, Dict[str, float]]:
+    """Merge every stored partial for days in [since, until] (YYYY-MM-DD, inclusive; 'unknown' only when unbounded)."""
+    merged: Dict[Key, Dict[str, float]] = {}
+    root = Path(root)
+    if not root.exists():
+        return merged
+    for day_dir in sorted(root.iterdir()):
+        if not (day_dir.is_dir() and day_dir.name.startswith('day=')):
+            continue
+        day = day_dir.name[4:]
+        if (since or until) and day == UNKNOWN:
+            continue
+        if (since and day < since) or (until and day > until):
+            continue
+        for p in sorted(day_dir.glob('*.json')):
+            for (agent, team), agg in _read_partial(p).items():
+                merge_into(merged.setdefault((agent, team, day), empty()), agg)
+    return merged
+
+
+def rollup(merged: Dict[Key, Dict[str, float]], by: Sequence[str]) -> List[Dict[str, Any]]:
+    """Group merged partials by the given dimensions; rates and means per group."""
+    unknown = [d for d in by if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown rollup dimension(s) {unknown}: expected {', '.join(DIMENSIONS)}")
+    groups: Dict[Tuple[str, ...], Dict[str, float]] = {}
+    for key, agg in merged.items():
+        dims = dict(zip(DIMENSIONS, key))
+        merge_into(groups.setdefault(tuple(dims[d] for d in by), empty()), agg)
+    rows = []
+    for key, agg in sorted(groups.items()):
+        n = agg['calls'] or 1
+        row = dict(zip(by, key))
+        row.update({
+            'calls': agg['calls'],
+            'violation_rate': agg['violations'] / n,
+            'profanity_rate': agg['profanity'] / n,
+            'agent_profanity_rate': agg['agent_profanity'] / n,
+            'borrower_profanity_rate': agg['borrower_profanity'] / n,
+            'mean_overtalk_pct': agg['overtalk_sum'] / n,
+            'mean_silence_pct': agg['silence_sum'] / n,
+        })
+        rows.append(row)
+    return rows
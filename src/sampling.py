@@ -0,0 +1,171 @@
+# Stratified random sampling for fast corpus-level estimates
+# src/sampling.py
+import math
+import random
+from pathlib import Path
+from statistics import NormalDist
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+# per-call quantities estimated from the sample: name -> (kind, extractor)
+# kind 'rate' targets --precision (a proportion), 'mean' targets --mean_precision (percentage points)
+ESTIMANDS = {
+    'profanity_rate': ('rate', lambda r: 1.0 if r.get('agent_prof') == 'Yes' or r.get('borrower_prof') == 'Yes' else 0.0),
+    'violation_rate': ('rate', lambda r: 1.0 if r.get('compliance_violation') == 'Yes' else 0.0),
+    'mean_overtalk_pct': ('mean', lambda r: float(r['raw_metrics']['overtalk'])),
+    'mean_silence_pct': ('mean', lambda r: float(r['raw_metrics']['silence'])),
+}
+
+
+def stratify(files: Sequence[Path], by: str = "folder", root: Optional[Path] = None,
+             size_bins: int = 4) -> Dict[str, List[Path]]:
+    """
+    Group files into strata: by source folder (relative to root) or by
+    file-size quantile bin. Returns {stratum: files}.
+    """
+    strata: Dict[str, List[Path]] = {}
+    if by == "folder":
+        for f in files:
+            parent = f.parent
+            if root is not None:
+                try:
+                    parent = parent.relative_to(root)
+                except ValueError:
+                    pass
+            strata.setdefault(str(parent) or ".", []).append(f)
+    elif by == "size":
+        sized = sorted(((f.stat().st_size, i) for i, f in enumerate(files)))
+        bins = max(1, min(size_bins, len(sized)))
+        for rank, (size, i) in enumerate(sized):
+            b = rank * bins // len(sized)
+            strata.setdefault(f"size_q{b + 1}", []).append(files[i])
+    else:
+        raise ValueError(f"Unknown stratification '{by}': expected 'folder' or 'size'")
+    return strata
+
+
+def sample_order(strata: Dict[str, List[Path]], seed: int = 0) -> Iterator[tuple]:
+    """
+    Yield (stratum, file) in a seeded order that keeps the sample
+    proportionally allocated at every prefix: the next draw always comes from
+    the stratum furthest behind its share N_h / N.
+    """
+    rnd = random.Random(seed)
+    pools = {}
+    for name in sorted(strata):
+        pool = list(strata[name])
+        rnd.shuffle(pool)
+        pools[name] = pool
+    taken = {name: 0 for name in pools}
+    total = sum(len(p) for p in pools.values())
+    for n in range(total):
+        name = min((s for s in pools if taken[s] < len(pools[s])),
+                   key=lambda s: (taken[s] - (n + 1) * len(pools[s]) / total, s))
+        yield name, pools[name][taken[name]]
+        taken[name] += 1
+
+
+class StratifiedEstimator:
+    """
+    Stratified means with finite-population-corrected confidence intervals:
+    normal intervals for the metric means, Wilson score intervals (on the
+    design's effective sample size) for the rates, so a rare event seen 0
+    times so far still gets a non-zero width.
+    """
+
+    def __init__(self, strata_sizes: Dict[str, int], confidence: float = 0.95):
+        self.sizes = dict(strata_sizes)
+        self.population = sum(self.sizes.values())
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.confidence = confidence
+        self.values: Dict[str, Dict[str, List[float]]] = {name: {s: [] for s in self.sizes} for name in ESTIMANDS}
+        self.sampled = {s: 0 for s in self.sizes}
+        self.errors = 0
+
+    def add(self, stratum: str, res: Dict[str, Any]):
+        if "error" in res:
+            self.errors += 1
+            return
+        self.sampled[stratum] += 1
+        for name, (_, extract) in ESTIMANDS.items():
+            self.values[name][stratum].append(extract(res))
+
+    @property
+    def n(self) -> int:
+        return sum(self.sampled.values())
+
+    def estimate(self, name: str) -> Dict[str, Any]:
+        by_stratum = self.values[name]
+        pooled = [v for vals in by_stratum.values() for v in vals]
+        if not pooled:
+            return {'estimate': None, 'ci_low': None, 'ci_high': None, 'half_width': math.inf}
+        pooled_var = _variance(pooled)
+        mean = 0.0
+        var = 0.0
+        covered = 0
+        for s, N_h in self.sizes.items():
+            vals = by_stratum[s]
+            if not vals:
+                continue
+            covered += N_h
+            n_h = len(vals)
+            W_h = N_h / self.population
+            s2 = _variance(vals) if n_h > 1 else pooled_var
+            mean += W_h * (sum(vals) / n_h)
+            var += W_h * W_h * (1 - n_h / N_h) * s2 / n_h
+        # strata not sampled yet: estimate over the covered part, and never claim precision
+        mean = mean * self.population / covered
+        if covered != self.population:
+            return {'estimate': mean, 'ci_low': None, 'ci_high': None, 'half_width': math.inf}
+        if ESTIMANDS[name][0] == 'rate':
+            low, high = self._wilson(mean, var, len(pooled))
+        else:
+            half = self.z * math.sqrt(var)
+            low, high = mean - half, mean + half
+        return {
+            'estimate': mean,
+            'ci_low': low,
+            'ci_high': high,
+            'half_width': (high - low) / 2,
+        }
+
+    def _wilson(self, p: float, var: float, n: int):
+        """
+        Wilson score interval for a proportion p with design variance var.
+        The effective sample size is p(1-p)/var; when that is undefined
+        (every sampled value alike, e.g. no violations yet) it is n with the
+        finite population correction, which keeps the interval honest.
+        """
+        p = min(1.0, max(0.0, p))
+        fpc = 1 - n / self.population
+        if fpc <= 0:
+            return p, p  # the whole population was analyzed
+        n_eff = p * (1 - p) / var if var > 0 and 0 < p < 1 else n / fpc
+        z2 = self.z * self.z
+        denom = 1 + z2 / n_eff
+        center = (p + z2 / (2 * n_eff)) / denom
+        half = self.z * math.sqrt(p * (1 - p) / n_eff + z2 / (4 * n_eff * n_eff)) / denom
+        return max(0.0, center - half), min(1.0, center + half)
+
+    def precise_enough(self, precision: float, mean_precision: float) -> bool:
+        for name, (kind, _) in ESTIMANDS.items():
+            target = precision if kind == 'rate' else mean_precision
+            if self.estimate(name)['half_width'] > target:
+                return False
+        return True
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'population': self.population,
+            'sampled': self.n,
+            'errors': self.errors,
+            'confidence': self.confidence,
+            'strata': {s: {'population': N_h, 'sampled': self.sampled[s]} for s, N_h in sorted(self.sizes.items())},
+            'estimates': {name: self.estimate(name) for name in ESTIMANDS},
+        }
+
+
+def _variance(vals: Sequence[float]) -> float:
+    if len(vals) < 2:
+        return 0.0
+    m = sum(vals) / len(vals)
+    return sum((v - m) ** 2 for v in vals) / (len(vals) - 1)
@@ -0,0 +1,261 @@
+# Long-lived local analysis service (HTTP over TCP or a Unix socket)
+# src/service.py
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .io_json import load_file, clean_utterances
+from .analysis import analyze_utterances, noop_stage, warm_patterns
+from .pii_compliance import get_ruleset
+from .match_cache import DEFAULT_CACHE
+from .telemetry import AnalyzerMetrics
+
+# (transcript, call_id, strict): transcript is the raw request body (JSON/YAML bytes) or an
+# already-parsed document; request data is never taken as a path
+Job = Tuple[Any, str, bool]
+
+def warm_analyzer():
+    """Compile the pattern files and the default rule set now rather than on the first request."""
+    warm_patterns()
+    get_ruleset()
+
+def analyze_job(job: Job, on_stage=noop_stage) -> Dict[str, Any]:
+    """Analyze one transcript; load errors come back like process_file's."""
+    doc, call_id, strict = job
+    meta = {}
+    on_stage("load")
+    try:
+        if isinstance(doc, bytes):
+            utt = load_file(doc, compact=True, meta=meta)
+        elif isinstance(doc, (list, dict)):
+            utt = clean_utterances(doc, compact=True, meta=meta)
+        else:  # a string here would be read as a file path by load_file
+            raise ValueError(f"Expected a transcript object or list, got {type(doc).__name__}")
+    except Exception as e:
+        return {"call_id": call_id, "error": str(e), "stage": "load"}
+    try:
+        res = analyze_utterances(utt, call_id, strict=strict, on_stage=on_stage)
+    except Exception as e:
+        return {"call_id": call_id, "error": str(e), "stage": "analysis"}
+    if meta:
+        res["metadata"] = meta  # as process_file attaches it
+    return res
+
+def timed_job(job: Job) -> Tuple[Dict[str, Any], float, List[Tuple[str, float]]]:
+    """
+    analyze_job timed on its own, wherever it runs: (result, seconds,
+    [(stage, seconds), ...]). The batch's wall time would charge every call
+    with its neighbours' work.
+    """
+    stages = []
+    current = [None, time.monotonic()]
+
+    def on_stage(name):
+        now = time.monotonic()
+        if current[0] is not None:
+            stages.append((current[0], now - current[1]))
+        current[:] = [name, now]
+
+    started = current[1]
+    res = analyze_job(job, on_stage=on_stage)
+    on_stage(None)
+    return res, time.monotonic() - started, stages
+
+
+class MicroBatcher:
+    """
+    Collects jobs from concurrent requests and analyzes them together: a batch
+    closes when it reaches max_batch jobs or max_wait seconds after its first
+    job. With workers > 1 batches are spread over a warm process pool.
+    """
+
+    def __init__(self, max_batch: int = 64, max_wait: float = 0.002, workers: int = 1,
+                 telemetry: Optional[AnalyzerMetrics] = None):
+        self.telemetry = telemetry or AnalyzerMetrics()
+        self.batch_size = self.telemetry.registry.histogram(
+            "callanalyzer_service_batch_size", "Calls per micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.workers = max(1, workers)
+        self.pool = None
+        if self.workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(self.workers, initializer=warm_analyzer)
+            # start the workers (and compile their patterns) before the first request
+            list(self.pool.map(analyze_job, [([], "warmup", False)] * self.workers))
+        else:
+            warm_analyzer()  # batches run in this process
+        self.queue: "queue.Queue[Optional[Tuple[Job, Future]]]" = queue.Queue()
+        self.batches = 0
+        self.jobs = 0
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, jobs: List[Job]) -> List[Dict[str, Any]]:
+        futures = []
+        for job in jobs:
+            fut = Future()
+            self.queue.put((job, fut))
+            futures.append(fut)
+        return [f.result() for f in futures]
+
+    def _next_batch(self):
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            jobs = [job for job, _ in batch]
+            try:
+                if self.pool is not None:
+                    chunk = max(1, len(jobs) // self.workers)
+                    results = list(self.pool.map(timed_job, jobs, chunksize=chunk))
+                else:
+                    results = [timed_job(job) for job in jobs]
+            except Exception as e:
+                results = [({"call_id": job[1], "error": str(e), "stage": "analysis"}, None, []) for job in jobs]
+            for (_, fut), (res, seconds, stages) in zip(batch, results):
+                for stage, s in stages:
+                    self.telemetry.stage_seconds.observe(s, stage=stage)
+                self.telemetry.record(res, seconds)
+                fut.set_result(res)
+            self.batch_size.observe(len(batch))
+            self.batches += 1
+            self.jobs += len(batch)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def _flag(value) -> bool:
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def parse_request(body: bytes, query: Dict[str, List[str]]) -> Tuple[List[Job], bool]:
+    """
+    Turn a POST /analyze body into jobs. Accepted bodies:
+      - one transcript as JSON or YAML text (a bare string is rejected, never read as a path)
+      - {"calls": [{"call_id": ..., "utterances": [...]}, ...]} for many calls
+    Returns (jobs, many); many=True means the response is a list.
+    """
+    strict = _flag(query.get("strict", ["false"])[0])
+    call_id = query.get("call_id", ["call"])[0]
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return [(body, call_id, strict)], False
+    if isinstance(data, dict) and isinstance(data.get("calls"), list):
+        jobs = []
+        for i, call in enumerate(data["calls"]):
+            cid = call.get("call_id", f"{call_id}-{i}") if isinstance(call, dict) else f"{call_id}-{i}"
+            jobs.append((call, str(cid), _flag(data.get("strict", strict))))
+        return jobs, True
+    if isinstance(data, dict) and "call_id" in data:
+        call_id = str(data["call_id"])
+        strict = _flag(data.get("strict", strict))
+    return [(data, call_id, strict)], False
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    server_version = "CallAnalyzer/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            body = self.server.batcher.telemetry.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path != "/health":
+            return self._send_json(404, {"error": "not found"})
+        b = self.server.batcher
+        payload = {"status": "ok", "jobs": b.jobs, "batches": b.batches}
+        if b.pool is None:  # with --workers each process has its own cache
+            payload["match_cache"] = DEFAULT_CACHE.stats()
+        self._send_json(200, payload)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/analyze":
+            return self._send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        jobs, many = parse_request(body, parse_qs(url.query))
+        results = self.server.batcher.submit(jobs)
+        self._send_json(200, {"results": results} if many else results[0])
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, batcher: MicroBatcher, verbose=False):
+        self.batcher = batcher
+        self.verbose = verbose
+        super().__init__(address, AnalysisHandler)
+
+
+class UnixAnalysisServer(AnalysisServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def make_server(host="127.0.0.1", port=8765, unix_socket=None, max_batch=64,
+                max_wait=0.002, workers=1, verbose=False) -> AnalysisServer:
+    batcher = MicroBatcher(max_batch=max_batch, max_wait=max_wait, workers=workers)
+    if unix_socket:
+        return UnixAnalysisServer(unix_socket, batcher, verbose=verbose)
+    return AnalysisServer((host, port), batcher, verbose=verbose)
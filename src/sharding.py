@@ -0,0 +1,90 @@
+# Deterministic sharding of a corpus across machines, and merging of shard outputs
+# src/sharding.py
+import csv
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+SHARD_DIR_RE = re.compile(r'^shard_(\d+)_of_(\d+)$')
+
+# every CSV run_batch.py may write; each is keyed by call id in its first column
+OUTPUT_FILES = [
+    "summary.csv", "details.csv", "errors.csv",
+    "summary_strict.csv", "details_strict.csv", "errors_strict.csv",
+    "summary_profanity.csv", "details_profanity.csv", "errors_profanity.csv",
+]
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse 'i/N' (0 <= i < N) into (i, N)."""
+    m = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', spec or "")
+    if not m:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 0/4")
+    i, n = int(m.group(1)), int(m.group(2))
+    if n < 1 or i >= n:
+        raise ValueError(f"Invalid shard '{spec}': need 0 <= i < N")
+    return i, n
+
+def shard_of(call_id: str, n: int) -> int:
+    """Stable shard index for a call id (same on every machine and Python run)."""
+    digest = hashlib.md5(call_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % n
+
+def shard_dir_name(i: int, n: int) -> str:
+    return f"shard_{i}_of_{n}"
+
+def find_shard_dirs(paths: Sequence[str]) -> List[Path]:
+    """Expand each path to itself, or to its shard_i_of_N subdirectories."""
+    dirs = []
+    for p in map(Path, paths):
+        subdirs = sorted(d for d in p.iterdir() if d.is_dir() and SHARD_DIR_RE.match(d.name)) if p.is_dir() else []
+        dirs.extend(subdirs or [p])
+    return dirs
+
+def missing_shards(dirs: Sequence[Path]) -> List[str]:
+    """Names of shard_i_of_N directories implied by `dirs` but not present."""
+    seen: Dict[int, set] = {}
+    for d in dirs:
+        m = SHARD_DIR_RE.match(d.name)
+        if m:
+            seen.setdefault(int(m.group(2)), set()).add(int(m.group(1)))
+    return [shard_dir_name(i, n) for n, got in seen.items() for i in range(n) if i not in got]
+
+def merge_csv(sources: Sequence[Path], dest: Path) -> int:
+    """
+    Merge shard CSVs into one file ordered the way a single-node run orders
+    them (by call id). Each call id lives in exactly one shard, so a stable
+    sort on the first column restores the single-node row order, including
+    multi-row calls in the details files. Returns the number of data rows.
+    """
+    header = None
+    rows = []
+    for src in sources:
+        with open(src, newline="", encoding="utf-8") as fh:
+            reader = csv.reader(fh)
+            h = next(reader, None)
+            if h is None:
+                continue
+            if header is None:
+                header = h
+            elif h != header:
+                raise ValueError(f"Header mismatch in {src}")
+            rows.extend(reader)
+    if header is None:
+        return 0
+    rows.sort(key=lambda r: r[0] if r else "")
+    with open(dest, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+def merge_shards(shard_dirs: Sequence[Path], output_dir: Path) -> Dict[str, int]:
+    """Merge every known output CSV found in shard_dirs into output_dir."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    merged = {}
+    for name in OUTPUT_FILES:
+        sources = [d / name for d in shard_dirs if (d / name).exists()]
+        if sources:
+            merged[name] = merge_csv(sources, output_dir / name)
+    return merged
@@ -0,0 +1,270 @@
+# Runtime metrics in Prometheus text format (served over HTTP or written to a textfile)
+# src/telemetry.py
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Tuple = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, state) -> List[str]:
+        counts, total, n = state
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.buckets, counts):
+            cumulative += c
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, (('le', _fmt(bound)),))} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+class AnalyzerMetrics:
+    """The analyzer's metric set; shared by run_batch.py and the analysis service."""
+
+    def __init__(self, registry: Optional[Registry] = None):
+        r = self.registry = registry or Registry()
+        self.files = r.counter("callanalyzer_files_processed_total", "Transcripts analyzed successfully")
+        self.errors = r.counter("callanalyzer_file_errors_total", "Transcripts that failed, by stage", ("stage", "timed_out"))
+        self.parse_errors = r.counter("callanalyzer_parse_errors_total", "Transcripts that could not be loaded/parsed")
+        self.utterances = r.counter("callanalyzer_utterances_total", "Utterances analyzed")
+        self.profanity = r.counter("callanalyzer_calls_with_profanity_total", "Analyzed calls with agent or borrower profanity")
+        self.violations = r.counter("callanalyzer_calls_with_violation_total", "Analyzed calls with a compliance violation")
+        self.stage_seconds = r.histogram("callanalyzer_stage_seconds", "Per-call latency of each analysis stage", ("stage",))
+        self.file_seconds = r.histogram("callanalyzer_file_seconds", "End-to-end latency per transcript")
+        self.files_total = r.gauge("callanalyzer_files_total", "Transcripts selected for the current run")
+        self.utterances_per_second = r.gauge("callanalyzer_utterances_per_second", "Utterances analyzed per second since start")
+        self.profanity_rate = r.gauge("callanalyzer_profanity_rate", "Share of analyzed calls with profanity")
+        self.violation_rate = r.gauge("callanalyzer_violation_rate", "Share of analyzed calls with a compliance violation")
+        self.start_time = r.gauge("callanalyzer_start_time_seconds", "Unix time the run/service started")
+        self.last_progress = r.gauge("callanalyzer_last_progress_time_seconds", "Unix time the last transcript finished (stall detection)")
+        self._started = time.monotonic()
+        self.start_time.set(time.time())
+
+    def record(self, res: Dict, seconds: Optional[float] = None):
+        """Account one finished transcript (a process_file-style result)."""
+        if "error" in res:
+            stage = res.get("stage") or "unknown"
+            self.errors.inc(stage=stage, timed_out="true" if res.get("timed_out") else "false")
+            if stage == "load" and not res.get("timed_out"):
+                self.parse_errors.inc()
+        else:
+            self.files.inc()
+            self.utterances.inc(res.get("raw_metrics", {}).get("utterances", 0))
+            prof = res.get("prof_details", {})
+            if res.get("agent_prof") == "Yes" or res.get("borrower_prof") == "Yes" or prof.get("agent_has") or prof.get("borrower_has"):
+                self.profanity.inc()
+            if res.get("compliance_violation") == "Yes":
+                self.violations.inc()
+        if seconds is not None:
+            self.file_seconds.observe(seconds)
+        self._update_rates()
+
+    def _update_rates(self):
+        n = self.files.value()
+        elapsed = max(1e-9, time.monotonic() - self._started)
+        self.utterances_per_second.set(self.utterances.value() / elapsed)
+        if n:
+            self.profanity_rate.set(self.profanity.value() / n)
+            self.violation_rate.set(self.violations.value() / n)
+        self.last_progress.set(time.time())
+
+    def stage_timer(self) -> "StageTimer":
+        return StageTimer(self)
+
+
+class StageTimer:
+    """on_stage callback that times each stage until the next one starts (or finish())."""
+
+    def __init__(self, metrics: AnalyzerMetrics):
+        self.metrics = metrics
+        self.started = time.monotonic()
+        self._stage = None
+        self._stage_start = self.started
+
+    def __call__(self, name: str):
+        now = time.monotonic()
+        if self._stage is not None:
+            self.metrics.stage_seconds.observe(now - self._stage_start, stage=self._stage)
+        self._stage = name
+        self._stage_start = now
+
+    def finish(self) -> float:
+        """Close the current stage; returns total seconds since the timer started."""
+        now = time.monotonic()
+        if self._stage is not None:
+            self.metrics.stage_seconds.observe(now - self._stage_start, stage=self._stage)
+            self._stage = None
+        return now - self.started
+
+
+def start_http_exporter(registry: Registry, port: int, host: str = "127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; returns the server (call shutdown() to stop)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+class TextfileExporter:
+    """
+    Periodically writes the registry to a file (e.g. for node_exporter's
+    textfile collector). Writes go to a temp file and are renamed into place.
+    """
+
+    def __init__(self, registry: Registry, path, interval: float = 15.0):
+        self.registry = registry
+        self.path = str(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.registry.render())
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {self.path}: {e}")
+
+    def stop(self):
+        """Stop the writer thread and write the final values."""
+        self._stop.set()
+        self._thread.join()
+        self.write()
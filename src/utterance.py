@@ -0,0 +1,58 @@
+# Compact utterance representation
+# src/utterance.py
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Optional
+
+CORE_FIELDS = ('speaker', 'text', 'stime', 'etime')
+
+
+class CompactUtterance(Mapping):
+    """
+    Read-only, slotted stand-in for a cleaned utterance dict.
+
+    Holds only speaker (interned, so every 'agent'/'borrower' is one shared
+    string), text and float stime/etime. Vendor extras (confidence arrays,
+    word timings, ...) are dropped unless named in `extra_fields` when the
+    call is loaded. Being a Mapping, it supports u['stime'], u.get('text', '')
+    and dict(u), so detectors, metrics and charts accept it unchanged.
+    """
+    __slots__ = ('speaker', 'text', 'stime', 'etime', 'extra')
+
+    def __init__(self, speaker: str, text: str, stime: float, etime: float,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.speaker = sys.intern(speaker)
+        self.text = text
+        self.stime = stime
+        self.etime = etime
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, u: Dict[str, Any], extra_fields: Iterable[str] = ()) -> "CompactUtterance":
+        """Build from a cleaned utterance dict (float times, normalized speaker)."""
+        extra = {k: u[k] for k in extra_fields if k in u and k not in CORE_FIELDS}
+        return cls(u['speaker'], u.get('text', ''), u['stime'], u['etime'], extra)
+
+    def __getitem__(self, key):
+        if key in CORE_FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from CORE_FIELDS
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return len(CORE_FIELDS) + (len(self.extra) if self.extra is not None else 0)
+
+    def __repr__(self):
+        return f"CompactUtterance({dict(self)!r})"
+
+    def __reduce__(self):
+        return (CompactUtterance, (self.speaker, self.text, self.stime, self.etime, self.extra))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self)
@@ -99,13 +99,15 @@ def timeline_figure(utterances, tick_step=5):
     overtalk, silence = get_overtalk_silence(df, total_time)
 
     fig = go.Figure()
+    # shapes are collected and set once: add_shape re-validates every shape already on the figure
+    shapes = []
 
     # Draw speech blocks (below)
     # Agent row = y in [-0.4,0.4], Borrower row = y in [0.6,1.4]
     for _, row in df.iterrows():
         color = AGENT_COLOR if row["speaker"] == "Agent" else BORROWER_COLOR
         y0, y1 = (-0.4, 0.4) if row["speaker"] == "Agent" else (0.6, 1.4)
-        fig.add_shape(
+        shapes.append(dict(
             type="rect",
             x0=row["start"],
             x1=row["end"],
@@ -114,13 +116,13 @@ def timeline_figure(utterances, tick_step=5):
             fillcolor=color,
             line=dict(width=0),
             layer="below"
-        )
+        ))
 
     # Silence: vertical grey blocks spanning both rows (behind speech)
     for s, e in silence:
         if e <= s:
             continue
-        fig.add_shape(
+        shapes.append(dict(
             type="rect",
             x0=s,
             x1=e,
@@ -130,7 +132,7 @@ def timeline_figure(utterances, tick_step=5):
             line=dict(width=0),
             opacity=0.45,
             layer="below"
-        )
+        ))
 
     # Overtalk: solid orange block on interrupter row (above speech)
     for s, e in overtalk:
@@ -147,7 +149,7 @@ def timeline_figure(utterances, tick_step=5):
             interrupter = starts.iloc[1]["speaker"]  # second starter is interrupter
 
         y0, y1 = (-0.4, 0.4) if interrupter == "Agent" else (0.6, 1.4)
-        fig.add_shape(
+        shapes.append(dict(
             type="rect",
             x0=s,
             x1=e,
@@ -157,13 +159,21 @@ def timeline_figure(utterances, tick_step=5):
             line=dict(width=0),
             opacity=1.0,
             layer="above"
-        )
+        ))
 
     # Call End marker (dashed red vertical line) - visible on chart only
-    fig.add_vline(
-        x=total_time,
+    # (the shape add_vline would add, spanning the y domain)
+    shapes.append(dict(
+        type="line",
+        x0=total_time,
+        x1=total_time,
+        xref="x",
+        y0=0,
+        y1=1,
+        yref="y domain",
         line=dict(color=CALL_END_COLOR, width=2, dash="dash"),
-    )
+    ))
+    fig.update_layout(shapes=shapes)
     fig.add_annotation(
         x=total_time,
         y=1.3,
@@ -0,0 +1,193 @@
+# Per-file time and memory limits for batch runs
+# src/watchdog.py
+import multiprocessing as mp
+import os
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_END = object()
+
+
+def _limit_memory(max_memory_mb: int):
+    """Cap the worker's address space so runaway allocations raise MemoryError."""
+    if resource is None:
+        return
+    limit = int(max_memory_mb) * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _worker_loop(conn, func, kwargs, max_memory_mb):
+    if max_memory_mb:
+        _limit_memory(max_memory_mb)
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        idx, item = msg
+
+        def on_stage(name, _idx=idx):
+            conn.send(("stage", _idx, name))
+
+        # reply outside the except blocks so a MemoryError traceback (and the
+        # frames holding the oversized data) is released before we send
+        reply = None
+        try:
+            reply = ("done", idx, func(item, on_stage=on_stage, **kwargs))
+        except MemoryError:
+            pass
+        except Exception as e:
+            reply = ("failed", idx, str(e))
+        if reply is None:
+            reply = ("failed", idx, f"memory limit exceeded ({max_memory_mb} MB)")
+        conn.send(reply)
+
+
+class _Worker:
+    def __init__(self, ctx, func, kwargs, max_memory_mb):
+        parent_conn, child_conn = ctx.Pipe()
+        self.conn = parent_conn
+        self.proc = ctx.Process(
+            target=_worker_loop,
+            args=(child_conn, func, kwargs, max_memory_mb),
+            daemon=True,
+        )
+        self.proc.start()
+        child_conn.close()
+        self.task = None
+        self.started = 0.0
+        self.stage = None
+
+    def submit(self, idx, item):
+        self.task = (idx, item)
+        self.started = time.monotonic()
+        self.stage = "queued"
+        self.conn.send((idx, item))
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.proc.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+def run_with_watchdog(
+    func: Callable[..., Dict[str, Any]],
+    items: Iterable[Any],
+    timeout: Optional[float] = None,
+    max_memory_mb: Optional[int] = None,
+    workers: Optional[int] = None,
+    on_stage_change: Optional[Callable[[Any, str], None]] = None,
+    **kwargs,
+) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+    """
+    Run func(item, on_stage=..., **kwargs) for every item in a pool of worker
+    processes and yield (item, result) pairs in input order.
+
+    func must be a picklable top-level function. It may call on_stage(name) to
+    report progress; the last reported stage is attached to failures.
+    A worker that exceeds `timeout` seconds on one item is killed and replaced,
+    so one bad input never stalls the rest of the batch. Failed items yield
+    {"error": ..., "stage": ..., "timed_out": bool} instead of func's result.
+    on_stage_change(item, stage) is called in this process as stages are reported.
+    items is consumed lazily, at most a few items per worker ahead of the
+    output, so a streamed input (e.g. bulk records) is never held in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    if hasattr(items, "__len__"):
+        workers = min(workers, len(items) or 1)
+    workers = max(1, workers)
+    source = iter(items)
+    window = workers * 4
+    ctx = mp.get_context()
+    pool = [_Worker(ctx, func, kwargs, max_memory_mb) for _ in range(workers)]
+
+    results = {}
+    submitted = {}
+    next_task = 0
+    next_out = 0
+    exhausted = False
+
+    def failure(w, message, timed_out=False):
+        idx, _ = w.task
+        results[idx] = {"error": message, "stage": w.stage, "timed_out": timed_out}
+        w.task = None
+
+    try:
+        while not exhausted or next_out < next_task:
+            for i, w in enumerate(pool):
+                # backpressure: don't run ahead of a slow item by more than the window
+                if w.task is None and not exhausted and next_task - next_out < window:
+                    item = next(source, _END)
+                    if item is _END:
+                        exhausted = True
+                        break
+                    if not w.proc.is_alive():
+                        w.kill()
+                        w = pool[i] = _Worker(ctx, func, kwargs, max_memory_mb)
+                    submitted[next_task] = item
+                    w.submit(next_task, item)
+                    next_task += 1
+
+            busy = [w for w in pool if w.task is not None]
+            wait_for = None
+            if timeout is not None and busy:
+                now = time.monotonic()
+                wait_for = max(0.0, min(w.started + timeout for w in busy) - now)
+            ready = wait([w.conn for w in busy], wait_for) if busy else []
+
+            for w in busy:
+                if w.conn not in ready:
+                    continue
+                try:
+                    kind, idx, payload = w.conn.recv()
+                except (EOFError, OSError):
+                    w.kill()
+                    message = f"worker exited unexpectedly (exit code {w.proc.exitcode})"
+                    if max_memory_mb:
+                        message += f"; memory limit is {max_memory_mb} MB"
+                    failure(w, message)
+                    continue
+                if kind == "stage":
+                    w.stage = payload
+                    if on_stage_change is not None:
+                        on_stage_change(w.task[1], payload)
+                elif kind == "done":
+                    results[idx] = payload
+                    w.task = None
+                else:
+                    failure(w, payload)
+
+            if timeout is not None:
+                now = time.monotonic()
+                for i, w in enumerate(pool):
+                    if w.task is not None and now - w.started > timeout:
+                        failure(w, f"timed out after {timeout:g}s", timed_out=True)
+                        w.kill()
+                        pool[i] = _Worker(ctx, func, kwargs, max_memory_mb)
+
+            while next_out in results:
+                yield submitted.pop(next_out), results.pop(next_out)
+                next_out += 1
+    finally:
+        for w in pool:
+            w.stop()
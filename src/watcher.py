@@ -0,0 +1,181 @@
+# Incremental discovery of newly landed transcripts for watch mode
+# src/watcher.py
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set, Tuple
+
+from .io_json import BULK_SUFFIXES
+
+EXTENSIONS = ('.json', '.yaml', '.yml') + BULK_SUFFIXES
+
+
+class DropWatcher:
+    """
+    Tracks a drop directory with a persistent index of processed files
+    (path -> [size, mtime]) and directory mtimes.
+
+    Each poll stats the known directories and lists only those whose mtime
+    changed (a file was added, removed or renamed in them), instead of
+    walking the whole tree. A new file is handed out once it is complete:
+    its size and mtime were unchanged between two polls and it has not been
+    modified for `settle` seconds. Files that failed to load (usually a
+    writer that paused longer than `settle`) are kept on a retry list and
+    handed out again if their size or mtime changes.
+
+    Files seen but not settled yet (and those handed out but not marked
+    done) are part of the index too: a directory's new mtime is only saved
+    along with them, so a restart inside the settle window still picks the
+    file up.
+
+    The index is a snapshot (index_path) plus an append-only log of the
+    entries changed since (index_path + ".log"), so a save costs the changes
+    of one cycle, not the whole index. The log is folded into a new snapshot
+    once it holds more lines than the snapshot has entries.
+    """
+
+    def __init__(self, root, index_path, settle: float = 2.0):
+        self.root = Path(root)
+        self.index_path = Path(index_path)
+        self.settle = settle
+        self.files: Dict[str, List[float]] = {}
+        self.dirs: Dict[str, float] = {}
+        self.retry: Dict[str, List[float]] = {}
+        self.pending: Dict[str, List[float]] = {}
+        self.handed: Set[str] = set()  # out of pending, not yet marked done
+        self.log_path = self.index_path.with_name(self.index_path.name + ".log")
+        self.changes: Dict[Tuple[str, str], Any] = {}  # (table, key) -> new value, None = removed
+        self.log_lines = 0
+        self.load()
+
+    def load(self):
+        if self.index_path.exists():
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            self.files = data.get("files", {})
+            self.dirs = data.get("dirs", {})
+            self.retry = data.get("retry", {})
+            self.pending = data.get("pending", {})
+        if self.log_path.exists():
+            with open(self.log_path, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        table, key, value = json.loads(line)
+                    except ValueError:
+                        break  # torn last line of an interrupted save
+                    self.log_lines += 1
+                    if value is None:
+                        getattr(self, table).pop(key, None)
+                    else:
+                        getattr(self, table)[key] = value
+
+    def _set(self, table: str, key: str, value):
+        entries = getattr(self, table)
+        if entries.get(key) != value:
+            entries[key] = value
+            self.changes[table, key] = value
+
+    def _drop(self, table: str, key: str):
+        if getattr(self, table).pop(key, None) is not None:
+            self.changes[table, key] = None
+
+    def save(self):
+        """Append this cycle's changes to the log; compact when the log outgrows the snapshot."""
+        if self.changes:
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write("".join(json.dumps([t, k, v]) + "\n" for (t, k), v in self.changes.items()))
+                fh.flush()
+            self.log_lines += len(self.changes)
+            self.changes = {}
+        if self.log_lines > max(1000, len(self.files) + len(self.dirs)):
+            self.compact()
+
+    def compact(self):
+        """Write the whole index as a new snapshot and start an empty log."""
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        pending = dict(self.pending, **{p: [-1, -1.0] for p in self.handed})
+        tmp.write_text(json.dumps({"root": str(self.root), "files": self.files, "dirs": self.dirs, "retry": self.retry,
+                                   "pending": pending}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+        # replaying a stale log over the new snapshot is harmless, so a crash here loses nothing
+        self.log_path.unlink(missing_ok=True)
+        self.log_lines = 0
+
+    def _scan_dir(self, d: str, changed: List[str]):
+        """List one directory; new subdirectories are scanned too."""
+        try:
+            st = os.stat(d)
+            entries = list(os.scandir(d))
+        except OSError:
+            self._drop("dirs", d)
+            return
+        self._set("dirs", d, st.st_mtime)
+        for e in entries:
+            if e.is_dir(follow_symlinks=False):
+                if e.path not in self.dirs:
+                    self._scan_dir(e.path, changed)
+            elif (e.name.lower().endswith(EXTENSIONS) and e.path not in self.files and e.path not in self.pending
+                  and e.path not in self.handed):
+                changed.append(e.path)
+
+    def poll(self) -> List[Path]:
+        """Return files that are new and complete since the last poll, in call_id order."""
+        discovered: List[str] = []
+        root = str(self.root)
+        if root not in self.dirs:
+            self._scan_dir(root, discovered)
+        now = time.time()
+        for d, mtime in list(self.dirs.items()):
+            try:
+                current = os.stat(d).st_mtime
+            except OSError:
+                self._drop("dirs", d)
+                continue
+            # recently touched dirs are re-listed too: coarse (e.g. NFS) mtimes can hide a second add
+            if current != mtime or now - current < max(self.settle, 2.0):
+                self._scan_dir(d, discovered)
+
+        for p, (size, mtime) in list(self.retry.items()):
+            try:
+                st = os.stat(p)
+            except OSError:
+                self._drop("retry", p)
+                self._drop("files", p)
+                continue
+            if [st.st_size, st.st_mtime] != [size, mtime]:
+                self._drop("retry", p)
+                self._drop("files", p)
+                discovered.append(p)
+
+        ready = []
+        for p in discovered:
+            self._set("pending", p, [-1, -1.0])  # forces at least one more poll before it counts as stable
+        for p, (size, mtime) in list(self.pending.items()):
+            try:
+                st = os.stat(p)
+            except OSError:
+                self._drop("pending", p)  # deleted or renamed before it settled
+                continue
+            if [st.st_size, st.st_mtime] == [size, mtime] and now - st.st_mtime >= self.settle:
+                self.pending.pop(p)  # stays pending in the saved index until mark_done
+                self.handed.add(p)
+                ready.append(Path(p))
+            else:
+                self._set("pending", p, [st.st_size, st.st_mtime])
+        ready.sort(key=lambda f: (f.stem, str(f)))
+        return ready
+
+    def mark_done(self, paths: List[Path], failed=()):
+        """Record processed files; those in `failed` are retried once they change."""
+        failed = {str(p) for p in failed}
+        for p in paths:
+            try:
+                st = os.stat(p)
+                entry = [st.st_size, st.st_mtime]
+            except OSError:
+                entry = [-1, -1.0]
+            self._set("files", str(p), entry)
+            self.handed.discard(str(p))
+            self.changes["pending", str(p)] = None
+            if str(p) in failed:
+                self._set("retry", str(p), entry)
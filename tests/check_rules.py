@@ -0,0 +1,159 @@
+# tests/check_rules.py
+"""
+Behaviour checks for the compiled compliance rule set (src/compliance_rules.py).
+
+    python tests/check_rules.py
+
+Runs the shipped rules file (patterns/compliance_rules.json) and the default
+rule over small hand-written calls: disclosure before/after verification,
+lenient vs strict verification, the mini-Miranda window, disclosure after a
+do-not-call request, and the single pass stopping early once no rule can
+change. Fails (exit code 1) on the first mismatch of each check.
+"""
+import sys
+import traceback
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.compliance_rules import RuleSet  # noqa: E402
+from src.match_cache import MatchCache  # noqa: E402
+from src.pii_compliance import BUILTIN_EVENTS, DEFAULT_RULES, get_ruleset  # noqa: E402
+
+RULES_FILE = "patterns/compliance_rules.json"
+
+MIRANDA = "This is a debt collector calling about your account."
+VERIFY = "Can you confirm your date of birth?"
+CONFIRMED = "Sure, my date of birth is March 3rd."
+DISCLOSE = "Your outstanding balance is 420 dollars."
+DNC = "Please stop calling me."
+
+
+def call(*turns):
+    """Utterances from (speaker, stime, text) tuples, one second each."""
+    return [{"speaker": s, "stime": t, "etime": t + 1.0, "text": x} for s, t, x in turns]
+
+
+def evaluate(utterances, strict=False, rules=RULES_FILE):
+    return get_ruleset(rules).evaluate(utterances, strict=strict, cache=MatchCache(maxsize=0))
+
+
+def check_disclosure_after_verification():
+    ok = evaluate(call(("agent", 0.0, MIRANDA), ("agent", 5.0, VERIFY), ("borrower", 8.0, CONFIRMED),
+                       ("agent", 12.0, DISCLOSE)))
+    assert not ok["violation"], ok
+    early = evaluate(call(("agent", 0.0, MIRANDA), ("agent", 5.0, DISCLOSE), ("agent", 9.0, VERIFY)))
+    rule = early["rules"]["disclosure_after_verification"]
+    assert rule["violation"] and early["violation"], early
+    assert early["evidence"] == rule["evidence"], "the first rule's evidence is the call's evidence"
+    assert rule["evidence"]["disclose_time"] == 5.0 and rule["evidence"]["verify_time"] == 9.0, rule
+    assert [e["type"] for e in rule["evidence"]["examples"]] == ["disclose", "verify"], rule
+
+
+def check_strict_sequence():
+    # the borrower's answer comes before the agent's request: lenient takes the request, strict needs
+    # a confirmation at or after it
+    utt = call(("agent", 0.0, MIRANDA), ("borrower", 2.0, CONFIRMED), ("agent", 3.0, VERIFY),
+               ("agent", 6.0, DISCLOSE))
+    lenient = evaluate(utt, rules=None)["rules"]["disclosure_after_verification"]
+    strict = evaluate(utt, strict=True, rules=None)["rules"]["disclosure_after_verification"]
+    assert not lenient["violation"], lenient
+    assert strict["violation"] and strict["evidence"]["verify_time"] is None, strict
+
+
+def check_mini_miranda_window():
+    late = evaluate(call(("agent", 10.0, "Hello, who am I speaking with?"), ("agent", 45.0, MIRANDA)))
+    rule = late["rules"]["mini_miranda_first_30s"]
+    assert rule["violation"] and rule["evidence"]["mini_miranda_time"] == 45.0, rule
+    assert "after the first 30s" in rule["evidence"]["reason"], rule
+    # the window counts from the call's first utterance, not from zero
+    inside = evaluate(call(("agent", 10.0, "Hello, who am I speaking with?"), ("agent", 39.0, MIRANDA)))
+    assert not inside["rules"]["mini_miranda_first_30s"]["violation"], inside
+    missing = evaluate(call(("agent", 0.0, "Hello.")))["rules"]["mini_miranda_first_30s"]
+    assert missing["violation"] and "not detected" in missing["evidence"]["reason"], missing
+    # the borrower saying it does not count: the event is agent-only
+    borrower = evaluate(call(("borrower", 0.0, MIRANDA)))["rules"]["mini_miranda_first_30s"]
+    assert borrower["violation"], borrower
+
+
+def check_no_disclosure_after_dnc():
+    utt = call(("agent", 0.0, MIRANDA), ("agent", 4.0, VERIFY), ("borrower", 6.0, DNC),
+               ("agent", 9.0, DISCLOSE), ("agent", 12.0, DISCLOSE))
+    rule = evaluate(utt)["rules"]["no_disclosure_after_dnc"]
+    assert rule["violation"], rule
+    assert rule["evidence"]["dnc_time"] == 6.0 and rule["evidence"]["disclose_time"] == 9.0, rule
+    before = evaluate(call(("agent", 0.0, MIRANDA), ("agent", 2.0, VERIFY), ("agent", 4.0, DISCLOSE),
+                           ("borrower", 6.0, DNC)))["rules"]["no_disclosure_after_dnc"]
+    assert not before["violation"], before
+    # a do-not-call phrase from the agent is not the borrower's request
+    agent = evaluate(call(("agent", 0.0, MIRANDA), ("agent", 3.0, "We will stop calling you."),
+                          ("agent", 5.0, DISCLOSE)))["rules"]["no_disclosure_after_dnc"]
+    assert not agent["violation"], agent
+
+
+def check_unsorted_input():
+    # rules are decided in start-time order, whatever order the utterances come in
+    utt = call(("agent", 9.0, VERIFY), ("agent", 0.0, MIRANDA), ("agent", 5.0, DISCLOSE))
+    rule = evaluate(utt)["rules"]["disclosure_after_verification"]
+    assert rule["violation"] and rule["evidence"]["disclose_time"] == 5.0, rule
+
+
+def check_early_break():
+    # once every event has fired and every never_after rule is closed, the rest is not looked at
+    head = call(("agent", 0.0, MIRANDA), ("agent", 2.0, VERIFY), ("borrower", 3.0, CONFIRMED),
+                ("borrower", 4.0, DNC), ("agent", 5.0, DISCLOSE))
+    tail = call(*[("agent", 10.0 + i, f"Filler line {i}.") for i in range(50)])
+    cache = MatchCache(maxsize=1000)
+    res = get_ruleset(RULES_FILE).evaluate(head + tail, cache=cache)
+    assert cache.hits + cache.misses == len(head), (cache.hits, cache.misses)
+    assert res["rules"]["no_disclosure_after_dnc"]["violation"], res
+    assert not res["rules"]["disclosure_after_verification"]["violation"], res
+
+    # without a DNC the never_after rule stays open and the whole call is scanned
+    cache = MatchCache(maxsize=1000)
+    res = get_ruleset(RULES_FILE).evaluate(head[:3] + head[4:] + tail, cache=cache)
+    assert cache.hits + cache.misses == len(head) - 1 + len(tail), (cache.hits, cache.misses)
+    assert not res["violation"], res
+
+
+def check_validation():
+    bad = [
+        ([], BUILTIN_EVENTS),
+        ([{"type": "sometime", "event": "disclose"}], BUILTIN_EVENTS),
+        ([{"type": "within", "event": "disclose"}], BUILTIN_EVENTS),
+        ([{"type": "after", "event": "disclose", "requires": "nope"}], BUILTIN_EVENTS),
+        ([{"type": "never_after", "event": "disclose", "trigger": "verify"}], BUILTIN_EVENTS),
+        (DEFAULT_RULES * 2, BUILTIN_EVENTS),
+        ([{"type": "within", "event": "loop", "seconds": 5}], {"loop": {"first_of": ["loop"]}}),
+    ]
+    for rules, events in bad:
+        try:
+            RuleSet(rules, events)
+        except ValueError:
+            continue
+        raise AssertionError(f"RuleSet accepted {rules!r}")
+
+
+CHECKS = [check_disclosure_after_verification, check_strict_sequence, check_mini_miranda_window,
+          check_no_disclosure_after_dnc, check_unsorted_input, check_early_break, check_validation]
+
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        try:
+            check()
+        except Exception:
+            failures += 1
+            print(f"❌ {check.__name__}")
+            traceback.print_exc()
+        else:
+            print(f"✔ {check.__name__}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ {len(CHECKS)} rule checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# tests/run_checks.py
+"""
+Start-up budget checks for the CLI entry points and the Streamlit app.
+
+    python tests/run_checks.py [--budget_ms 200] [--runs 5]
+
+Fails (exit code 1) when an entry point imports a heavy optional dependency
+at module load, loads pattern files on import, or when its import time
+regresses past the budget (best of --runs fresh interpreters).
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# dependencies that must only be imported by the feature that needs them
+HEAVY = ["pandas", "numpy", "openpyxl", "plotly", "streamlit", "yaml", "multiprocessing"]
+
+ENTRY_POINTS = ["run_batch", "run_service"]
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t) * 1000
+import src.profanity, src.pii_compliance
+print(json.dumps({{
+    "ms": ms,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "patterns_loaded": src.profanity._PROFANITY_PATTERNS is not None or src.pii_compliance._PII_PATTERNS is not None,
+}}))
+"""
+
+def probe(module, runs):
+    best = None
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        res = json.loads(out.strip().splitlines()[-1])
+        if best is None or res["ms"] < best["ms"]:
+            best = res
+    return best
+
+def app_top_level_imports():
+    """Modules app.py imports at module level (it cannot be imported outside Streamlit)."""
+    tree = ast.parse((ROOT / "app.py").read_text(encoding="utf-8"))
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(a.name for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+    return names
+
+def main():
+    ap = argparse.ArgumentParser(description="Import-time budget checks")
+    ap.add_argument("--budget_ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", 200)),
+                    help="Maximum import time per entry point in ms (default: 200 or $IMPORT_BUDGET_MS)")
+    ap.add_argument("--runs", type=int, default=5, help="Fresh interpreters per entry point; the best run counts")
+    args = ap.parse_args()
+
+    failures = []
+    for module in ENTRY_POINTS:
+        res = probe(module, args.runs)
+        print(f"{module}: {res['ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if res["ms"] > args.budget_ms:
+            failures.append(f"{module} import took {res['ms']:.1f} ms > {args.budget_ms:.0f} ms")
+        if res["heavy"]:
+            failures.append(f"{module} imports {', '.join(res['heavy'])} at module load")
+        if res["patterns_loaded"]:
+            failures.append(f"{module} loads pattern files at import")
+
+    heavy_in_app = sorted(m for m in app_top_level_imports()
+                          if m.split(".")[0] in HEAVY and m.split(".")[0] != "streamlit" or m == "src.viz")
+    if heavy_in_app:
+        failures.append(f"app.py imports {', '.join(heavy_in_app)} at module level")
+
+    for f in failures:
+        print(f"❌ {f}")
+    if failures:
+        sys.exit(1)
+    print("✅ Start-up checks passed")
+
+if __name__ == "__main__":
+    main()